@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+import json
+import random
+import argparse
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src-python"))
+from util import reverse_arabic_if_needed, reverse_arabic_columns
+
+
+SAMPLES = [
+    "مرحبا بالعالم",
+    "محمد أحمد",
+    "12/05/2023",
+    "3-7-24",
+    "1250.75",
+    "42",
+    "Invoice total",
+    "INV-2024-0001",
+    "",
+    None,
+]
+
+
+def make_frame(cells, columns, seed=0):
+    rng = random.Random(seed)
+    rows = cells // columns
+    return pd.DataFrame(
+        [[rng.choice(SAMPLES) for _ in range(columns)] for _ in range(rows)],
+        dtype=object
+    )
+
+
+def best_of(func, df, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="reverse_arabic_if_needed: per-cell map vs column-wise")
+    parser.add_argument("--cells", type=int, default=1_000_000)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_frame(args.cells, args.columns)
+    per_cell, expected = best_of(lambda frame: frame.map(reverse_arabic_if_needed), df, args.repeat)
+    vectorized, actual = best_of(reverse_arabic_columns, df, args.repeat)
+
+    pd.testing.assert_frame_equal(actual, expected)
+    print(json.dumps({
+        "cells": df.size,
+        "map_seconds": round(per_cell, 3),
+        "vectorized_seconds": round(vectorized, 3),
+        "speedup": round(per_cell / vectorized, 2),
+        "identical": True,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
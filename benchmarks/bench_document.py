@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+import pypdf
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src-python"))
+from document import PdfDocument
+
+
+# Mirrors what camelot.read_pdf(pages=str(n)) did per page: one parse to
+# resolve the page selection, another to split the page out
+def split_per_page(file_path, pages, tempdir):
+    for page_num in pages:
+        with open(file_path, 'rb') as f:
+            len(pypdf.PdfReader(f, strict=False).pages)
+        with open(file_path, 'rb') as f:
+            reader = pypdf.PdfReader(f, strict=False)
+            writer = pypdf.PdfWriter()
+            writer.add_page(reader.pages[page_num - 1])
+            with open(os.path.join(tempdir, f"page-{page_num}.pdf"), 'wb') as out:
+                writer.write(out)
+
+
+def split_with_session(file_path, pages):
+    with PdfDocument(file_path) as document:
+        document.split_pages(pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-page open/split overhead")
+    parser.add_argument("pdf")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with PdfDocument(args.pdf) as document:
+        pages = list(range(1, document.total_pages + 1))
+
+    per_page, session = [], []
+    for _ in range(args.repeat):
+        tempdir = tempfile.mkdtemp()
+        start = time.perf_counter()
+        split_per_page(args.pdf, pages, tempdir)
+        per_page.append(time.perf_counter() - start)
+        shutil.rmtree(tempdir)
+
+        start = time.perf_counter()
+        split_with_session(args.pdf, pages)
+        session.append(time.perf_counter() - start)
+
+    old, new = min(per_page), min(session)
+    print(f"pages: {len(pages)}")
+    print(f"open per page: {old:.3f}s ({old / len(pages) * 1000:.2f} ms/page)")
+    print(f"document session: {new:.3f}s ({new / len(pages) * 1000:.2f} ms/page)")
+    print(f"saved per page: {(old - new) / len(pages) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
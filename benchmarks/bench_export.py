@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import json
+import random
+import argparse
+import tempfile
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src-python"))
+from export import make_writer, format_available, TABLE_FORMATS
+
+
+SAMPLES = [
+    "مرحبا بالعالم",
+    "محمد أحمد",
+    "12/05/2023",
+    "1250.75",
+    "42",
+    "Invoice total",
+    "INV-2024-0001",
+    "",
+]
+
+
+def make_pages(pages, tables_per_page, rows, columns, seed=0):
+    # Shaped like engine output: string cells, integer column labels and
+    # camelot metadata in df.attrs
+    rng = random.Random(seed)
+    result = []
+    for page_num in range(1, pages + 1):
+        frames = []
+        for _ in range(tables_per_page):
+            df = pd.DataFrame(
+                [[rng.choice(SAMPLES) for _ in range(columns)] for _ in range(rows)],
+                dtype=object
+            )
+            df.attrs = {"page": page_num, "flavor": "lattice", "bbox": [36.0, 72.0, 576.0, 720.0],
+                        "accuracy": 99.1, "whitespace": 12.5}
+            frames.append(df)
+        result.append((page_num, frames))
+    return result
+
+
+def legacy_excel(pages, path):
+    # What run_extraction did before streaming: concat everything, to_excel
+    df = pd.concat([df for _, frames in pages for df in frames], ignore_index=True)
+    df.to_excel(path, index=False)
+    return [path]
+
+
+def streamed(output_format, pages, path):
+    writer = make_writer(output_format, path)
+    for page_num, frames in pages:
+        writer.write_page(page_num, frames)
+    writer.close()
+    return writer.paths
+
+
+def measure(func, repeat, tempdir, name):
+    timings = []
+    for i in range(repeat):
+        path = os.path.join(tempdir, f"{i}-{name}")
+        start = time.perf_counter()
+        paths = func(path)
+        timings.append(time.perf_counter() - start)
+        size = sum(os.path.getsize(p) for p in paths)
+        for p in paths:
+            os.remove(p)
+    return min(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write time and file size per output format")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--tables-per-page", type=int, default=1)
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages, args.tables_per_page, args.rows, args.columns)
+    results = {}
+    with tempfile.TemporaryDirectory() as tempdir:
+        seconds, size = measure(lambda path: legacy_excel(pages, path), args.repeat, tempdir, "legacy.xlsx")
+        results["xlsx_to_excel"] = {"seconds": round(seconds, 3), "bytes": size}
+
+        for output_format in TABLE_FORMATS:
+            if not format_available(output_format):
+                results[output_format] = {"skipped": "pyarrow not installed"}
+                continue
+            seconds, size = measure(
+                lambda path: streamed(output_format, pages, path),
+                args.repeat, tempdir, f"out.{output_format}"
+            )
+            results[output_format] = {"seconds": round(seconds, 3), "bytes": size}
+
+    baseline = results["xlsx_to_excel"]["seconds"]
+    for entry in results.values():
+        if "seconds" in entry:
+            entry["speedup_vs_to_excel"] = round(baseline / entry["seconds"], 2) if entry["seconds"] else None
+
+    print(json.dumps({
+        "tables": args.pages * args.tables_per_page,
+        "cells": args.pages * args.tables_per_page * args.rows * args.columns,
+        "formats": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
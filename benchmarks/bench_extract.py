@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src-python"))
+from util import ExtractTable
+from engine import ExtractionEngine
+from progress import ProgressChannel
+
+
+# End-to-end wall clock for one document: extraction, progress delivery to a
+# subscriber and the Excel export. Run it on two commits to compare.
+async def run(args):
+    engine = ExtractionEngine(workers=args.workers, chunk_size=args.chunk_size)
+    channel = ProgressChannel()
+    delivered = []
+
+    async def subscriber():
+        async for event_id, data in channel.subscribe():
+            delivered.append(data["type"])
+
+    watcher = asyncio.create_task(subscriber())
+    try:
+        start = time.perf_counter()
+        extractor = ExtractTable(args.pdf, channel, engine=engine)
+        df = await extractor.extract_table_from_pdf(flavor=args.flavor, pages="all")
+        extracted = time.perf_counter()
+
+        if not df.empty:
+            with tempfile.TemporaryDirectory() as tempdir:
+                await engine.run_in_thread(df.to_excel, os.path.join(tempdir, "out.xlsx"), index=False)
+        exported = time.perf_counter()
+
+        channel.close()
+        await watcher
+    finally:
+        engine.shutdown()
+
+    return {
+        "pdf": os.path.basename(args.pdf),
+        "flavor": args.flavor,
+        "rows": len(df),
+        "extract_seconds": round(extracted - start, 3),
+        "export_seconds": round(exported - extracted, 3),
+        "total_seconds": round(exported - start, 3),
+        "events_delivered": len(delivered),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wall-clock time of the extraction hot path")
+    parser.add_argument("pdf")
+    parser.add_argument("--flavor", default="lattice")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
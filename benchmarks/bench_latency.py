@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import threading
+import statistics
+import httpx
+import uvicorn
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src-python"))
+
+
+# Starts the API in a background thread, kicks off a long extraction and
+# measures /pdf/{filename} response times while it runs
+def start_server(port):
+    from main import app
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def probe(client, filename, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get(f"/pdf/{filename}")
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.05)
+
+
+async def run(args):
+    base_url = f"http://127.0.0.1:{args.port}"
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        with open(args.pdf, "rb") as f:
+            response = await client.post("/upload-pdf", files={"file": (os.path.basename(args.pdf), f, "application/pdf")})
+        filename = response.json()["filename"]
+
+        stop = asyncio.Event()
+        latencies = []
+        prober = asyncio.create_task(probe(client, filename, stop, latencies))
+
+        start = time.perf_counter()
+        response = await client.post("/extract-tables", params={"filename": filename, "flavor": args.flavor, "pages": args.pages})
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await prober
+
+    latencies.sort()
+    return {
+        "extraction_seconds": round(elapsed, 3),
+        "extraction_success": response.json().get("success"),
+        "pdf_requests": len(latencies),
+        "pdf_p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+        "pdf_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else None,
+        "pdf_max_ms": round(latencies[-1], 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/pdf latency during a long extraction")
+    parser.add_argument("pdf")
+    parser.add_argument("--flavor", default="lattice")
+    parser.add_argument("--pages", default="all")
+    parser.add_argument("--port", type=int, default=8018)
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="exit non-zero if the worst /pdf response is slower than this")
+    args = parser.parse_args()
+
+    server = start_server(args.port)
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        server.should_exit = True
+
+    print(json.dumps(result, indent=2))
+    if args.max_ms is not None and (result["pdf_max_ms"] is None or result["pdf_max_ms"] > args.max_ms):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
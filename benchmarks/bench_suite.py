@@ -0,0 +1,228 @@
+import os
+import sys
+import time
+import json
+import asyncio
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows, peak RSS is not reported
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src-python"))
+sys.path.insert(0, os.path.dirname(__file__))
+import camelot
+from corpus import generate
+from document import PdfDocument
+from engine import ExtractionEngine, extract_pages
+from export import make_writer, format_available
+from util import ExtractTable, normalize_frames
+
+
+# Regression suite over the synthetic corpus. Every stage is timed on its
+# own so a slowdown can be pinned on opening, parsing, post-processing,
+# concatenation or export:
+#
+#   python benchmarks/bench_suite.py --pages 40 --output before.json
+#   (apply a change)
+#   python benchmarks/bench_suite.py --pages 40 --output after.json
+#
+# Parsing runs page by page in this process for per-page latencies, the
+# pipeline stage runs the whole document through ExtractTable and the
+# process pool the way the server does.
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(__file__), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def timing(seconds, pages=None):
+    result = {"seconds": round(seconds, 4)}
+    if pages:
+        result["pages_per_s"] = round(pages / seconds, 2) if seconds else None
+    return result
+
+
+def latency(samples):
+    samples_ms = np.array(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(samples_ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(samples_ms, 95)), 2),
+        "max_ms": round(float(samples_ms.max()), 2),
+    }
+
+
+def stage_open(path):
+    start = time.perf_counter()
+    document = PdfDocument(path)
+    opened = time.perf_counter()
+    page_paths = document.split_pages(list(range(1, document.total_pages + 1)))
+    split = time.perf_counter()
+    return document, page_paths, {
+        "open": timing(opened - start),
+        "split": timing(split - opened, len(page_paths)),
+    }
+
+
+def stage_parse(page_paths, flavor):
+    per_page = []
+    frames = []
+    for page_num, page_path in page_paths:
+        start = time.perf_counter()
+        [(_, page_frames)] = extract_pages([(page_num, page_path)], flavor)
+        per_page.append(time.perf_counter() - start)
+        frames.extend(page_frames)
+    return frames, {**timing(sum(per_page), len(page_paths)), **latency(per_page), "tables": len(frames)}
+
+
+def stage_postprocess(frames):
+    start = time.perf_counter()
+    normalized = normalize_frames(frames)
+    return normalized, {
+        **timing(time.perf_counter() - start),
+        "cells": int(sum(df.size for df in frames)),
+    }
+
+
+def stage_concat(frames):
+    start = time.perf_counter()
+    df = pd.concat(frames, ignore_index=True)
+    return df, {**timing(time.perf_counter() - start), "rows": len(df)}
+
+
+def stage_export(frames, output_format, tempdir):
+    path = os.path.join(tempdir, f"export.{output_format}")
+    start = time.perf_counter()
+    writer = make_writer(output_format, path)
+    for df in frames:
+        writer.write_page(df.attrs.get("page", 0), [df])
+    writer.close()
+    elapsed = time.perf_counter() - start
+    size = sum(os.path.getsize(p) for p in writer.paths)
+    for p in writer.paths:
+        os.remove(p)
+    return {**timing(elapsed), "bytes": size}
+
+
+async def stage_pipeline(path, flavor, engine, tempdir):
+    writer = make_writer("xlsx", os.path.join(tempdir, "pipeline.xlsx"))
+    start = time.perf_counter()
+    extractor = ExtractTable(path, engine=engine, sink=writer)
+    await extractor.extract_table_from_pdf(flavor=flavor, pages="all")
+    if extractor.tables_found:
+        await engine.run_in_thread(writer.close)
+    else:
+        writer.discard()
+    elapsed = time.perf_counter() - start
+    with PdfDocument(path) as document:
+        pages = document.total_pages
+    return {**timing(elapsed, pages), "tables": extractor.tables_found}
+
+
+def run_document(path, args, engine, tempdir):
+    document, page_paths, result = stage_open(path)
+    result["pages"] = len(page_paths)
+    result["parse"] = {}
+    result["postprocess"] = {}
+    result["concat"] = {}
+    result["export"] = {}
+    try:
+        for flavor in args.flavors:
+            frames, result["parse"][flavor] = stage_parse(page_paths, flavor)
+            if not frames:
+                continue
+            normalized, result["postprocess"][flavor] = stage_postprocess(frames)
+            _, result["concat"][flavor] = stage_concat(normalized)
+            result["export"][flavor] = {
+                output_format: stage_export(normalized, output_format, tempdir)
+                for output_format in args.formats
+                if format_available(output_format)
+            }
+    finally:
+        document.close()
+
+    if args.workers != 0:
+        result["pipeline"] = {
+            flavor: asyncio.run(stage_pipeline(path, flavor, engine, tempdir))
+            for flavor in args.flavors
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage-by-stage benchmark over a synthetic PDF corpus")
+    parser.add_argument("--corpus", default=None, help="Directory of PDFs, generated into a temp dir if omitted")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per generated document")
+    parser.add_argument("--rows", type=int, default=30)
+    parser.add_argument("--columns", type=int, default=5)
+    parser.add_argument("--flavors", nargs="+", default=["lattice", "stream"])
+    parser.add_argument("--formats", nargs="+", default=["xlsx"])
+    parser.add_argument("--workers", type=int, default=None, help="Pool size for the pipeline stage, 0 skips it")
+    parser.add_argument("--output", default=None, help="Write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    engine = ExtractionEngine(workers=args.workers) if args.workers != 0 else None
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "camelot": camelot.__version__,
+        "pandas": pd.__version__,
+        "settings": {
+            "pages": args.pages, "rows": args.rows, "columns": args.columns,
+            "flavors": args.flavors, "formats": args.formats, "workers": args.workers,
+        },
+        "documents": {},
+    }
+
+    try:
+        with tempfile.TemporaryDirectory() as tempdir:
+            if args.corpus:
+                documents = {
+                    os.path.splitext(name)[0]: os.path.join(args.corpus, name)
+                    for name in sorted(os.listdir(args.corpus)) if name.lower().endswith(".pdf")
+                }
+            else:
+                documents = generate(os.path.join(tempdir, "corpus"), args.pages, args.rows, args.columns)
+
+            for name, path in documents.items():
+                print(f"Benchmarking {name}", file=sys.stderr)
+                report["documents"][name] = run_document(path, args, engine, tempdir)
+    finally:
+        if engine is not None:
+            engine.shutdown()
+
+    report["peak_rss_mb"] = peak_rss_mb()
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
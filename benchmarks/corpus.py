@@ -0,0 +1,346 @@
+import os
+import struct
+import random
+import argparse
+from pypdf import PdfWriter
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    NameObject,
+    NumberObject,
+    TextStringObject,
+)
+
+
+# Synthetic PDFs for the benchmark suite, written directly with pypdf so no
+# PDF library beyond the app's own dependencies is needed:
+#
+#   ruled.pdf    grid-lined tables (lattice)
+#   unruled.pdf  whitespace-aligned tables (stream)
+#   arabic.pdf   ruled tables with Arabic cells in visual order, like the
+#                government PDFs reverse_arabic_if_needed was written for
+#   mixed.pdf    ruled, unruled, prose and blank pages in rotation
+#
+# Arabic needs a TrueType font with Arabic glyphs (DejaVu Sans is found in
+# the usual places, or pass --font). Without one arabic.pdf is skipped.
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+FONT_SIZE = 9
+
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+
+LATIN_WORDS = ["Invoice", "Total", "Amount", "Region", "North", "South", "Paid", "Pending", "Item", "Qty"]
+ARABIC_WORDS = ["محمد", "أحمد", "علي", "فاطمة", "غزة", "خان يونس", "رفح", "ذكر", "أنثى", "مدينة"]
+PROSE = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, quis nostrud "
+    "exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat."
+)
+
+
+class TrueTypeFont:
+    # Just enough of the TrueType format to embed a font: the Unicode cmap
+    # (format 4) and advance widths
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = f.read()
+        self.name = os.path.splitext(os.path.basename(path))[0].replace(" ", "")
+        self.tables = {}
+        num_tables = struct.unpack(">H", self.data[4:6])[0]
+        for i in range(num_tables):
+            tag, _, offset, length = struct.unpack(">4sIII", self.data[12 + 16 * i:28 + 16 * i])
+            self.tables[tag.decode("latin-1")] = (offset, length)
+
+        self.units_per_em = struct.unpack(">H", self._table("head")[18:20])[0]
+        self.cmap = self._read_cmap()
+        self.advances = self._read_advances()
+
+    def _table(self, tag):
+        offset, length = self.tables[tag]
+        return self.data[offset:offset + length]
+
+    def _read_cmap(self):
+        cmap = self._table("cmap")
+        count = struct.unpack(">H", cmap[2:4])[0]
+        for i in range(count):
+            platform, encoding, offset = struct.unpack(">HHI", cmap[4 + 8 * i:12 + 8 * i])
+            if (platform, encoding) == (3, 1) and struct.unpack(">H", cmap[offset:offset + 2])[0] == 4:
+                return self._read_format4(cmap, offset)
+        raise ValueError("font has no Windows Unicode BMP cmap")
+
+    @staticmethod
+    def _read_format4(cmap, offset):
+        seg_count = struct.unpack(">H", cmap[offset + 6:offset + 8])[0] // 2
+        ends_at = offset + 14
+        starts_at = ends_at + 2 * seg_count + 2
+        deltas_at = starts_at + 2 * seg_count
+        range_offsets_at = deltas_at + 2 * seg_count
+
+        mapping = {}
+        for i in range(seg_count):
+            end = struct.unpack(">H", cmap[ends_at + 2 * i:ends_at + 2 * i + 2])[0]
+            start = struct.unpack(">H", cmap[starts_at + 2 * i:starts_at + 2 * i + 2])[0]
+            delta = struct.unpack(">h", cmap[deltas_at + 2 * i:deltas_at + 2 * i + 2])[0]
+            range_offset_at = range_offsets_at + 2 * i
+            range_offset = struct.unpack(">H", cmap[range_offset_at:range_offset_at + 2])[0]
+            for code in range(start, min(end, 0xFFFE) + 1):
+                if range_offset == 0:
+                    glyph = (code + delta) & 0xFFFF
+                else:
+                    glyph_at = range_offset_at + range_offset + 2 * (code - start)
+                    glyph = struct.unpack(">H", cmap[glyph_at:glyph_at + 2])[0]
+                    if glyph:
+                        glyph = (glyph + delta) & 0xFFFF
+                if glyph:
+                    mapping[code] = glyph
+        return mapping
+
+    def _read_advances(self):
+        metrics = struct.unpack(">H", self._table("hhea")[34:36])[0]
+        hmtx = self._table("hmtx")
+        return [struct.unpack(">H", hmtx[4 * i:4 * i + 2])[0] for i in range(metrics)]
+
+    def width(self, glyph):
+        advance = self.advances[min(glyph, len(self.advances) - 1)]
+        return int(advance * 1000 / self.units_per_em)
+
+    def covers(self, text):
+        return all(ord(ch) in self.cmap for ch in text)
+
+
+class CorpusWriter:
+    def __init__(self, font=None):
+        self.writer = PdfWriter()
+        self.font = font
+        self.used_glyphs = {}
+        self.resources = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({
+                NameObject("/F1"): self.writer._add_object(DictionaryObject({
+                    NameObject("/Type"): NameObject("/Font"),
+                    NameObject("/Subtype"): NameObject("/Type1"),
+                    NameObject("/BaseFont"): NameObject("/Helvetica"),
+                    NameObject("/Encoding"): NameObject("/WinAnsiEncoding"),
+                }))
+            })
+        })
+        self._unicode_font = None
+        if font is not None:
+            self._unicode_font = self.writer._add_object(DictionaryObject())
+            self.resources["/Font"][NameObject("/F2")] = self._unicode_font
+
+    def text(self, x, y, value):
+        if value.isascii():
+            escaped = value.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            return f"BT /F1 {FONT_SIZE} Tf 1 0 0 1 {x:.2f} {y:.2f} Tm ({escaped}) Tj ET\n"
+
+        # Arabic is stored in visual (reversed) order, as in the source PDFs
+        glyphs = []
+        for ch in reversed(value):
+            glyph = self.font.cmap[ord(ch)]
+            self.used_glyphs[glyph] = ch
+            glyphs.append(f"{glyph:04X}")
+        return f"BT /F2 {FONT_SIZE} Tf 1 0 0 1 {x:.2f} {y:.2f} Tm <{''.join(glyphs)}> Tj ET\n"
+
+    def add_page(self, content):
+        page = self.writer.add_blank_page(PAGE_WIDTH, PAGE_HEIGHT)
+        stream = DecodedStreamObject()
+        stream.set_data(content.encode("latin-1"))
+        page[NameObject("/Contents")] = self.writer._add_object(stream)
+        page[NameObject("/Resources")] = self.resources
+
+    def ruled_table(self, rows, x=40, y=740, cell_width=105, cell_height=18):
+        content = ["0.5 w 0 0 0 RG\n"]
+        for r, row in enumerate(rows):
+            for c, value in enumerate(row):
+                left, top = x + c * cell_width, y - r * cell_height
+                content.append(f"{left} {top - cell_height} {cell_width} {cell_height} re S\n")
+                content.append(self.text(left + 4, top - cell_height + 5, value))
+        return "".join(content)
+
+    def unruled_table(self, rows, x=40, y=740, column_width=105, line_height=14):
+        return "".join(
+            self.text(x + c * column_width, y - r * line_height, value)
+            for r, row in enumerate(rows)
+            for c, value in enumerate(row)
+        )
+
+    def prose(self, lines=30, x=40, y=740, line_height=14):
+        words = PROSE.split()
+        content = []
+        for i in range(lines):
+            start = (i * 9) % len(words)
+            content.append(self.text(x, y - i * line_height, " ".join(words[start:start + 12])))
+        return "".join(content)
+
+    def write(self, path):
+        if self._unicode_font is not None and self.used_glyphs:
+            self._finish_unicode_font()
+        with open(path, "wb") as f:
+            self.writer.write(f)
+
+    def _finish_unicode_font(self):
+        font = self.font
+        font_file = DecodedStreamObject()
+        font_file.set_data(font.data)
+        font_file[NameObject("/Length1")] = NumberObject(len(font.data))
+
+        descriptor = DictionaryObject({
+            NameObject("/Type"): NameObject("/FontDescriptor"),
+            NameObject("/FontName"): NameObject(f"/{font.name}"),
+            NameObject("/Flags"): NumberObject(32),
+            NameObject("/FontBBox"): ArrayObject([NumberObject(v) for v in (-1000, -400, 2000, 1200)]),
+            NameObject("/ItalicAngle"): NumberObject(0),
+            NameObject("/Ascent"): NumberObject(900),
+            NameObject("/Descent"): NumberObject(-250),
+            NameObject("/CapHeight"): NumberObject(700),
+            NameObject("/StemV"): NumberObject(80),
+            NameObject("/FontFile2"): self.writer._add_object(font_file),
+        })
+
+        widths = ArrayObject()
+        for glyph in sorted(self.used_glyphs):
+            widths.extend([NumberObject(glyph), ArrayObject([NumberObject(font.width(glyph))])])
+
+        descendant = DictionaryObject({
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/CIDFontType2"),
+            NameObject("/BaseFont"): NameObject(f"/{font.name}"),
+            NameObject("/CIDSystemInfo"): DictionaryObject({
+                NameObject("/Registry"): TextStringObject("Adobe"),
+                NameObject("/Ordering"): TextStringObject("Identity"),
+                NameObject("/Supplement"): NumberObject(0),
+            }),
+            NameObject("/FontDescriptor"): self.writer._add_object(descriptor),
+            NameObject("/DW"): NumberObject(600),
+            NameObject("/W"): widths,
+            NameObject("/CIDToGIDMap"): NameObject("/Identity"),
+        })
+
+        to_unicode = DecodedStreamObject()
+        to_unicode.set_data(self._to_unicode_cmap().encode("latin-1"))
+
+        self._unicode_font.get_object().update({
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type0"),
+            NameObject("/BaseFont"): NameObject(f"/{font.name}"),
+            NameObject("/Encoding"): NameObject("/Identity-H"),
+            NameObject("/DescendantFonts"): ArrayObject([self.writer._add_object(descendant)]),
+            NameObject("/ToUnicode"): self.writer._add_object(to_unicode),
+        })
+
+    def _to_unicode_cmap(self):
+        lines = [
+            "/CIDInit /ProcSet findresource begin",
+            "12 dict begin",
+            "begincmap",
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+            "/CMapName /Adobe-Identity-UCS def",
+            "/CMapType 2 def",
+            "1 begincodespacerange",
+            "<0000> <FFFF>",
+            "endcodespacerange",
+        ]
+        items = sorted(self.used_glyphs.items())
+        for i in range(0, len(items), 100):
+            batch = items[i:i + 100]
+            lines.append(f"{len(batch)} beginbfchar")
+            lines.extend(f"<{glyph:04X}> <{ord(ch):04X}>" for glyph, ch in batch)
+            lines.append("endbfchar")
+        lines.extend(["endcmap", "CMapName currentdict /CMap defineresource pop", "end", "end"])
+        return "\n".join(lines)
+
+
+def table_rows(rng, rows, columns, arabic=False):
+    words = ARABIC_WORDS if arabic else LATIN_WORDS
+    result = [[f"Col {c + 1}" for c in range(columns)]]
+    for r in range(rows - 1):
+        row = []
+        for c in range(columns):
+            kind = c % 4
+            if kind == 0:
+                row.append(str(r + 1))
+            elif kind == 1:
+                row.append(rng.choice(words))
+            elif kind == 2:
+                row.append(f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/20{rng.randint(10, 24)}")
+            else:
+                row.append(f"{rng.uniform(0, 10000):.2f}")
+        result.append(row)
+    return result
+
+
+def find_font(path=None):
+    for candidate in [path] + FONT_CANDIDATES if path else FONT_CANDIDATES:
+        if candidate and os.path.exists(candidate):
+            try:
+                font = TrueTypeFont(candidate)
+            except (ValueError, KeyError, struct.error):
+                continue
+            if all(font.covers(word.replace(" ", "")) for word in ARABIC_WORDS):
+                return font
+    return None
+
+
+def generate(out_dir, pages=50, rows=30, columns=5, seed=0, font_path=None):
+    # Returns {name: path} of the documents written
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    font = find_font(font_path)
+    documents = {}
+
+    def build(name, page_content, needs_font=False):
+        if needs_font and font is None:
+            return
+        corpus = CorpusWriter(font if needs_font else None)
+        for page_num in range(pages):
+            corpus.add_page(page_content(corpus, page_num))
+        path = os.path.join(out_dir, f"{name}.pdf")
+        corpus.write(path)
+        documents[name] = path
+
+    build("ruled", lambda corpus, _: corpus.ruled_table(table_rows(rng, rows, columns)))
+    build("unruled", lambda corpus, _: corpus.unruled_table(table_rows(rng, rows, columns)))
+    build("arabic", lambda corpus, _: corpus.ruled_table(table_rows(rng, rows, columns, arabic=True)),
+          needs_font=True)
+
+    def mixed(corpus, page_num):
+        kind = page_num % 4
+        if kind == 0:
+            return corpus.ruled_table(table_rows(rng, rows, columns))
+        if kind == 1:
+            return corpus.unruled_table(table_rows(rng, rows, columns))
+        if kind == 2:
+            return corpus.prose()
+        return ""
+
+    build("mixed", mixed)
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the synthetic benchmark corpus")
+    parser.add_argument("out_dir")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=30)
+    parser.add_argument("--columns", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--font", default=None, help="TrueType font with Arabic glyphs")
+    args = parser.parse_args()
+
+    documents = generate(args.out_dir, args.pages, args.rows, args.columns, args.seed, args.font)
+    for name, path in documents.items():
+        print(f"{name}: {path}")
+    if "arabic" not in documents:
+        print("arabic: skipped, no font with Arabic glyphs found (use --font)")
+
+
+if __name__ == "__main__":
+    main()
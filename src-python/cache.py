@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+import camelot
+import pandas as pd
+
+# Bumped whenever the shape of cached page results changes
+RESULT_FORMAT = 3
+
+
+class ResultCache:
+    # Per-page table results on local disk, keyed on the PDF's content hash
+    # plus everything that affects camelot's output. Least recently used
+    # entries are evicted once the cache grows past max_bytes, and entries
+    # written more than max_age seconds ago are treated as misses however
+    # often they are read. On disk a file's mtime is its creation time and
+    # its atime its last use.
+    def __init__(self, root, max_bytes=1024 ** 3, max_age=7 * 24 * 60 * 60):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def key(document_hash, page_num, flavor, params=None):
+        payload = json.dumps(
+            [document_hash, page_num, flavor, params or {}, camelot.__version__, pd.__version__, RESULT_FORMAT],
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.pkl")
+
+    def _load_index(self):
+        # One directory scan at startup, afterwards the index is kept in memory
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                entries.append((max(stat.st_atime, stat.st_mtime), entry.name[:-4], stat.st_size, stat.st_mtime))
+        for _, key, size, created in sorted(entries):
+            self._entries[key] = (size, created)
+            self.size += size
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] > self.max_age:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+
+        try:
+            with open(self._path(key), 'rb') as f:
+                frames = pickle.load(f)
+            os.utime(self._path(key), (time.time(), entry[1]))
+        except Exception:
+            # Unreadable or written by an incompatible pandas: drop and re-extract
+            with self._lock:
+                self._remove(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return frames
+
+    def put(self, key, frames):
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(frames, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        size = os.path.getsize(path)
+
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries[key][0]
+            self._entries[key] = (size, time.time())
+            self._entries.move_to_end(key)
+            self.size += size
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_pages(self, document_hash, page_numbers, flavor, params=None):
+        results = {}
+        for page_num in page_numbers:
+            frames = self.get(self.key(document_hash, page_num, flavor, params))
+            if frames is not None:
+                results[page_num] = frames
+        return results
+
+    def put_pages(self, document_hash, page_results, flavor, params=None):
+        for page_num, frames in page_results:
+            self.put(self.key(document_hash, page_num, flavor, params), frames)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= entry[0]
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "max_age_seconds": self.max_age,
+            }
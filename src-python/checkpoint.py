@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import pickle
+import shutil
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Jobs in these states when the server went away are picked up again
+RESUMABLE_STATUSES = ["queued", "running", "interrupted"]
+
+
+class JobCheckpoint:
+    # Durable per-job record: job.json with the job's parameters and last
+    # known status, plus one pickle per finished page. Pages are written as
+    # soon as their chunk returns, so a job restarted under the same ID only
+    # parses the pages that never finished.
+    def __init__(self, root, job_id):
+        self.job_id = job_id
+        self.path = os.path.join(root, job_id)
+
+    def _page_path(self, page_num):
+        return os.path.join(self.path, f"page-{page_num}.pkl")
+
+    def _write(self, path, data, binary=True):
+        os.makedirs(self.path, exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb' if binary else 'w') as f:
+            if binary:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            else:
+                json.dump(data, f)
+        os.replace(temp_path, path)
+
+    def save_job(self, job_data):
+        self._write(os.path.join(self.path, "job.json"), job_data, binary=False)
+
+    def load_job(self):
+        try:
+            with open(os.path.join(self.path, "job.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get_pages(self, page_numbers):
+        results = {}
+        for page_num in page_numbers:
+            try:
+                with open(self._page_path(page_num), 'rb') as f:
+                    results[page_num] = pickle.load(f)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                # Torn or incompatible page, parse it again
+                logger.warning("Ignoring checkpoint for page %s of job %s: %s", page_num, self.job_id, e)
+        return results
+
+    def put_pages(self, page_results):
+        for page_num, frames in page_results:
+            self._write(self._page_path(page_num), frames)
+
+    def completed_pages(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(
+            int(name[len("page-"):-len(".pkl")])
+            for name in os.listdir(self.path)
+            if name.startswith("page-") and name.endswith(".pkl")
+        )
+
+    def discard(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class CheckpointStore:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def for_job(self, job_id):
+        return JobCheckpoint(self.root, job_id)
+
+    def resumable_jobs(self):
+        # Oldest first so restarted jobs keep their original order
+        jobs = []
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            job_data = JobCheckpoint(self.root, entry.name).load_job()
+            if job_data is not None and job_data.get("status") in RESUMABLE_STATUSES:
+                jobs.append(job_data)
+        return sorted(jobs, key=lambda job_data: job_data.get("created_at") or "")
+
+    def expire(self, max_age):
+        cutoff = time.time() - max_age
+        removed = 0
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        return removed
@@ -0,0 +1,233 @@
+import os
+import sys
+import glob
+import json
+import time
+import asyncio
+import argparse
+import traceback
+import multiprocessing
+from datetime import datetime
+from util import ExtractTable
+from engine import ExtractionEngine, FLAVORS
+from cache import ResultCache
+from export import make_writer, format_available, TABLE_FORMATS
+from document import count_pages
+
+# Headless batch extraction, same pipeline as the server without HTTP:
+#
+#   python cli.py invoices/ "archive/2024-*.pdf" --out results --flavor auto
+#
+# Every PDF found is written to results/<name>.xlsx (or --format) and results/summary.json
+# records the outcome of each file. The summary is rewritten after every
+# file, so rerunning the same command after an interruption skips files
+# that already finished. Pages finished inside an interrupted file are in
+# the result cache and are not parsed again either.
+
+SUMMARY_NAME = "summary.json"
+
+
+def find_pdfs(inputs):
+    found = []
+    for source in inputs:
+        if os.path.isdir(source):
+            for root, _, names in os.walk(source):
+                found.extend(os.path.join(root, name) for name in names if name.lower().endswith(".pdf"))
+        elif glob.has_magic(source):
+            found.extend(path for path in glob.glob(source, recursive=True) if path.lower().endswith(".pdf"))
+        elif os.path.isfile(source):
+            found.append(source)
+        else:
+            print(f"Skipping {source}: not a file, directory or matching pattern")
+
+    unique = []
+    seen = set()
+    for path in sorted(os.path.abspath(path) for path in found):
+        if path not in seen:
+            seen.add(path)
+            unique.append(path)
+    return unique
+
+
+def fingerprint(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def output_names(pdfs, previous, extension):
+    # Keep the names an earlier run assigned so resumed outputs line up,
+    # new files get <stem>.<ext> or <stem>-<n>.<ext> on collision
+    names = {}
+    taken = set()
+    for path in pdfs:
+        entry = previous.get(path)
+        if entry and entry.get("output", "").endswith(f".{extension}"):
+            names[path] = entry["output"]
+            taken.add(entry["output"])
+
+    for path in pdfs:
+        if path in names:
+            continue
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name = f"{stem}.{extension}"
+        n = 1
+        while name in taken:
+            n += 1
+            name = f"{stem}-{n}.{extension}"
+        names[path] = name
+        taken.add(name)
+    return names
+
+
+class Summary:
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        self.started_at = datetime.now().isoformat()
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.files = json.load(f).get("files", {})
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable summary {path}: {str(e)}")
+
+    def is_done(self, path, output):
+        entry = self.files.get(path)
+        if entry is None or entry["status"] not in ["done", "empty"] or entry.get("output") != output:
+            return False
+        # A file changed since it was processed is extracted again
+        return fingerprint(path) == {"size": entry.get("size"), "mtime": entry.get("mtime")}
+
+    def record(self, path, entry):
+        self.files[path] = entry
+        self.save()
+
+    def totals(self):
+        totals = {"files": len(self.files), "done": 0, "empty": 0, "failed": 0, "pages": 0, "tables": 0}
+        for entry in self.files.values():
+            totals[entry["status"]] = totals.get(entry["status"], 0) + 1
+            totals["pages"] += entry.get("pages", 0)
+            totals["tables"] += entry.get("tables", 0)
+        return totals
+
+    def save(self):
+        # Written to a temporary file and renamed so an interruption never
+        # leaves a truncated summary behind
+        data = {
+            "started_at": self.started_at,
+            "updated_at": datetime.now().isoformat(),
+            "totals": self.totals(),
+            "files": self.files
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+async def extract_file(path, output_path, args, engine, cache):
+    writer = make_writer(args.format, output_path, sheet_per_page=args.sheet_per_page)
+    extractor = ExtractTable(
+        path, engine=engine, cache=cache, sink=writer, prescan=args.prescan,
+        memory_limit=args.memory_limit * 1024 * 1024 if args.memory_limit else None,
+        typed=args.infer_types, stitch=args.stitch
+    )
+    try:
+        await extractor.extract_table_from_pdf(flavor=args.flavor, pages="all")
+        if not extractor.tables_found:
+            writer.discard()
+            return "empty", extractor
+        await engine.run_in_thread(writer.close)
+        return "done", extractor
+    except BaseException:
+        writer.discard()
+        raise
+
+
+async def run(args):
+    if not format_available(args.format):
+        print(f"{args.format} output needs pyarrow installed")
+        return 1
+
+    pdfs = find_pdfs(args.inputs)
+    if not pdfs:
+        print("No PDF files found")
+        return 1
+
+    os.makedirs(args.out, exist_ok=True)
+    summary = Summary(os.path.join(args.out, SUMMARY_NAME))
+    names = output_names(pdfs, summary.files, args.format)
+    pending = [path for path in pdfs if args.force or not summary.is_done(path, names[path])]
+    print(f"Found {len(pdfs)} PDF files, {len(pdfs) - len(pending)} already done, {len(pending)} to process")
+
+    engine = ExtractionEngine(workers=args.workers, chunk_size=args.chunk_size)
+    cache = ResultCache(args.cache_dir or os.path.join(args.out, ".cache"))
+    # Several files in flight keep the pool busy while one is between pages
+    slots = asyncio.Semaphore(args.files)
+
+    async def process(path):
+        async with slots:
+            output_path = os.path.join(args.out, names[path])
+            entry = {"output": names[path], **fingerprint(path)}
+            start = time.perf_counter()
+            try:
+                status, extractor = await extract_file(path, output_path, args, engine, cache)
+                entry.update({
+                    "status": status,
+                    "pages": await engine.run_in_thread(count_pages, path),
+                    "tables": extractor.tables_found,
+                    "skipped_pages": extractor.skipped_pages
+                })
+                if extractor.typed:
+                    entry["memory"] = extractor.memory_report()
+            except Exception as e:
+                print(f"Error extracting {path}: {str(e)}")
+                print(traceback.format_exc())
+                entry.update({"status": "failed", "error": str(e)})
+            entry["seconds"] = round(time.perf_counter() - start, 3)
+            summary.record(path, entry)
+            print(f"{entry['status']}: {path} ({entry.get('tables', 0)} tables, {entry['seconds']}s)")
+
+    try:
+        await asyncio.gather(*(process(path) for path in pending))
+    finally:
+        engine.shutdown()
+
+    totals = summary.totals()
+    print(json.dumps(totals))
+    return 1 if totals["failed"] else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract tables from a batch of PDFs without the server")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("--out", default="extracted", help="Output directory for workbooks and summary.json")
+    parser.add_argument("--flavor", default="lattice", choices=FLAVORS)
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes, defaults to CPU count")
+    parser.add_argument("--chunk-size", type=int, default=1, help="Pages per worker task")
+    parser.add_argument("--files", type=int, default=2, help="PDFs extracted concurrently")
+    parser.add_argument("--format", default="xlsx", choices=TABLE_FORMATS)
+    parser.add_argument("--sheet-per-page", action="store_true", help="One sheet per page instead of one sheet per file")
+    parser.add_argument("--prescan", action="store_true", help="Skip pages without signs of a table")
+    parser.add_argument("--cache-dir", default=None, help="Result cache, defaults to <out>/.cache")
+    parser.add_argument("--stitch", action="store_true", help="Join tables that continue across page breaks")
+    parser.add_argument("--infer-types", action="store_true",
+                        help="Write number and date columns as numbers and dates instead of text")
+    parser.add_argument("--memory-limit", type=int, default=None,
+                        help="MiB of table data held per file before pages spill to a temp file")
+    parser.add_argument("--force", action="store_true", help="Reprocess files the summary marks as done")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        return asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("Interrupted, rerun the same command to resume")
+        return 130
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import pypdf
+from camelot.utils import get_page_layout, get_text_objects, get_rotation
+
+
+def fix_page_rotation(page_path):
+    # Same rotation fix camelot applies when it splits pages itself
+    layout, dim = get_page_layout(page_path)
+    chars = get_text_objects(layout, ltype="char")
+    horizontal_text = get_text_objects(layout, ltype="horizontal_text")
+    vertical_text = get_text_objects(layout, ltype="vertical_text")
+    rotation = get_rotation(chars, horizontal_text, vertical_text)
+    if rotation == "":
+        return
+
+    with open(page_path, 'rb') as f:
+        page = pypdf.PdfReader(f, strict=False).pages[0]
+        if rotation == "anticlockwise":
+            page.rotate(90)
+        elif rotation == "clockwise":
+            page.rotate(-90)
+        writer = pypdf.PdfWriter()
+        writer.add_page(page)
+        rotated_path = page_path + ".rotated"
+        with open(rotated_path, 'wb') as out:
+            writer.write(out)
+    os.replace(rotated_path, page_path)
+
+
+def count_pages(file_path):
+    # Reads /Count from the page tree root instead of len(reader.pages),
+    # which loads and flattens every page object in the document
+    with open(file_path, 'rb') as f:
+        reader = pypdf.PdfReader(f, strict=False)
+        try:
+            count = int(reader.trailer["/Root"]["/Pages"]["/Count"])
+            if count > 0:
+                return count
+        except (KeyError, TypeError, ValueError):
+            pass
+        return len(reader.pages)
+
+
+LAST_PAGE = "last"
+
+
+def page_spec_items(spec):
+    # "1-5,9,12-20", "last", "10-" (10 to the end), "-3" (1 to 3) or "all",
+    # as (start, end) pairs where either end may be LAST_PAGE. Only checks
+    # the syntax, parse_pages resolves it against a page count.
+    spec = str(spec).strip().lower()
+    if spec == "all":
+        return [(1, LAST_PAGE)]
+
+    items = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            raise ValueError(f"Empty entry in page selection '{spec}'")
+        start, dash, end = item.partition("-")
+        if dash and not start.strip() and not end.strip():
+            raise ValueError(f"Invalid page range '{item}'")
+        if dash:
+            bounds = (page_bound(start.strip(), 1, item), page_bound(end.strip(), LAST_PAGE, item))
+        else:
+            bounds = (page_bound(item, None, item),) * 2
+        if LAST_PAGE not in bounds and bounds[0] > bounds[1]:
+            raise ValueError(f"Page range '{item}' runs backwards")
+        items.append(bounds)
+    return items
+
+
+def page_bound(value, default, item):
+    if value == "":
+        if default is None:
+            raise ValueError(f"Invalid page '{item}'")
+        return default
+    if value == LAST_PAGE:
+        return LAST_PAGE
+    try:
+        page = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid page '{item}'")
+    if page < 1:
+        raise ValueError(f"Pages are numbered from 1, got '{item}'")
+    return page
+
+
+def parse_pages(spec, total_pages):
+    # Sorted page numbers without duplicates. Open ranges stop at the last
+    # page, an explicit page past it is an error.
+    pages = set()
+    for start, end in page_spec_items(spec):
+        start = total_pages if start == LAST_PAGE else start
+        end = total_pages if end == LAST_PAGE else end
+        if max(start, end) > total_pages:
+            raise ValueError(f"Page {max(start, end)} is out of range, the document has {total_pages} pages")
+        if start > end:
+            raise ValueError(f"Page range '{start}-{end}' runs backwards")
+        pages.update(range(start, end + 1))
+    return sorted(pages)
+
+
+class PdfDocument:
+    # Parses a PDF once per extraction job and splits pages on demand
+    def __init__(self, file_path, password=None):
+        self.file_path = file_path
+        self._file = open(file_path, 'rb')
+        self.reader = pypdf.PdfReader(self._file, strict=False)
+        if self.reader.is_encrypted:
+            self.reader.decrypt(password or "")
+        self.total_pages = len(self.reader.pages)
+        self.tempdir = None
+        self.page_paths = {}
+        self._content_hash = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def content_hash(self):
+        if self._content_hash is None:
+            digest = hashlib.sha256()
+            with open(self.file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    def split_pages(self, pages):
+        # Camelot derives Table.page from the "page-{n}.pdf" file name
+        if self.tempdir is None:
+            self.tempdir = tempfile.mkdtemp(prefix="extract_")
+
+        for page_num in pages:
+            if page_num in self.page_paths:
+                continue
+            if not 1 <= page_num <= self.total_pages:
+                raise ValueError(f"Page {page_num} is out of range (1-{self.total_pages})")
+
+            page_path = os.path.join(self.tempdir, f"page-{page_num}.pdf")
+            writer = pypdf.PdfWriter()
+            writer.add_page(self.reader.pages[page_num - 1])
+            with open(page_path, 'wb') as f:
+                writer.write(f)
+            self.page_paths[page_num] = page_path
+
+        return [(page_num, self.page_paths[page_num]) for page_num in pages]
+
+    def release_pages(self, pages):
+        # Deletes split pages once they are parsed, close() removes the rest
+        for page_num in pages:
+            page_path = self.page_paths.pop(page_num, None)
+            if page_path is not None and os.path.exists(page_path):
+                os.remove(page_path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.tempdir is not None:
+            shutil.rmtree(self.tempdir, ignore_errors=True)
+            self.tempdir = None
+            self.page_paths = {}
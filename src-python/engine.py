@@ -0,0 +1,201 @@
+import os
+import time
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from camelot.parsers import Lattice, Stream
+from document import fix_page_rotation
+from prescan import has_ruling_lines
+from metrics import PAGE_PARSE_SECONDS, WORKER_BUSY_SECONDS, CHUNKS_IN_FLIGHT
+
+FLAVORS = ["lattice", "stream", "auto"]
+
+
+def page_flavor(page_path):
+    try:
+        return "lattice" if has_ruling_lines(page_path) else "stream"
+    except Exception:
+        return "lattice"
+
+
+def table_frame(table, page_num):
+    # Camelot's per-table metadata travels with the frame in df.attrs, it
+    # survives pickling to the parent process and the result cache
+    df = table.df
+    bbox = getattr(table, "_bbox", None)
+    cols = getattr(table, "cols", None)
+    df.attrs = {
+        "page": page_num,
+        "flavor": getattr(table, "flavor", None),
+        "bbox": [float(v) for v in bbox] if bbox is not None else None,
+        "cols": [[float(x0), float(x1)] for x0, x1 in cols] if cols else None,
+        "accuracy": getattr(table, "accuracy", None),
+        "whitespace": getattr(table, "whitespace", None),
+    }
+    return df
+
+
+def extract_pages(page_paths, flavor, backend=None, timings=None):
+    # Runs inside a worker process on pages already split by PdfDocument,
+    # one parser instance per flavor per chunk. backend replaces camelot's
+    # image conversion for lattice pages when given, timings collects the
+    # seconds spent on each page when given.
+    #
+    # With "auto" each page goes to lattice if its content draws ruling
+    # lines and to stream otherwise, the other parser only runs on pages
+    # where the first one found nothing.
+    if flavor not in FLAVORS:
+        raise NotImplementedError(f"Unknown flavor '{flavor}'")
+
+    parsers = {}
+
+    def parser(name):
+        if name not in parsers:
+            if name == "lattice":
+                parsers[name] = Lattice(backend=backend) if backend is not None else Lattice()
+            else:
+                parsers[name] = Stream()
+        return parsers[name]
+
+    results = []
+    for page_num, page_path in page_paths:
+        start = time.perf_counter()
+        fix_page_rotation(page_path)
+        if flavor == "auto":
+            first = page_flavor(page_path)
+            page_tables = parser(first).extract_tables(page_path)
+            if not page_tables:
+                fallback = "stream" if first == "lattice" else "lattice"
+                page_tables = parser(fallback).extract_tables(page_path)
+        else:
+            page_tables = parser(flavor).extract_tables(page_path)
+        results.append((page_num, [table_frame(table, page_num) for table in page_tables]))
+        if timings is not None:
+            timings.append(time.perf_counter() - start)
+    return results
+
+
+def timed_extract_pages(page_paths, flavor, backend=None):
+    # Pool entry point: timed in the worker so time spent queued for a free
+    # process does not count as parsing
+    timings = []
+    return extract_pages(page_paths, flavor, backend, timings), timings
+
+
+def pool_context():
+    # forkserver where the platform has it, spawn elsewhere (Windows)
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+class ExtractionEngine:
+    # Camelot parsing runs in the process pool; blocking pandas and file work
+    # (PDF splitting, concat, Excel writing) runs in the thread pool so the
+    # event loop never does either
+    def __init__(self, workers=None, chunk_size=1, io_workers=4, raster=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.io_workers = io_workers
+        # Chunks submitted ahead of the results, enough to keep every worker
+        # busy while the next chunk's pages are split
+        self.max_in_flight = self.workers * 2
+        # Optional RasterCache shared by lattice runs across jobs
+        self.raster = raster
+        self._executor = None
+        self._threads = None
+
+    @property
+    def executor(self):
+        # Start the pool lazily so importing the server does not start workers.
+        # Workers never fork from the server itself, which by then runs the
+        # log listener and the I/O threads.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=pool_context())
+        return self._executor
+
+    @property
+    def threads(self):
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(
+                max_workers=self.io_workers,
+                thread_name_prefix="extract-io"
+            )
+        return self._threads
+
+    async def run_in_thread(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.threads, functools.partial(func, *args, **kwargs))
+
+    def chunks(self, pages):
+        pages = list(pages)
+        return [pages[i:i + self.chunk_size] for i in range(0, len(pages), self.chunk_size)]
+
+    def cache_params(self, flavor):
+        # Lattice tables depend on the page images, so results rendered by
+        # pdfium and by Ghostscript are cached apart
+        if flavor not in ["lattice", "auto"]:
+            return None
+        renderer = self.raster.renderer_name() if self.raster is not None else "ghostscript"
+        return {"renderer": renderer}
+
+    async def map_pages(self, document, pages, flavor):
+        # Yields each chunk's (page_num, tables) pairs as soon as it finishes,
+        # callers are responsible for putting pages back in order. A chunk's
+        # pages are split just before it is submitted and deleted once it
+        # returns, and at most max_in_flight chunks are out at a time, so
+        # temp files are bounded by the pool size rather than the selection.
+        loop = asyncio.get_running_loop()
+        chunks = iter(self.chunks(pages))
+        backend = None
+        if flavor in ["lattice", "auto"] and self.raster is not None and pages:
+            backend = self.raster.backend(await self.run_in_thread(document.content_hash))
+        in_flight = {}
+
+        async def submit():
+            chunk = next(chunks, None)
+            if chunk is None:
+                return False
+            page_paths = await self.run_in_thread(document.split_pages, chunk)
+            future = loop.run_in_executor(self.executor, timed_extract_pages, page_paths, flavor, backend)
+            in_flight[future] = chunk
+            CHUNKS_IN_FLIGHT.inc()
+            return True
+
+        try:
+            while len(in_flight) < self.max_in_flight and await submit():
+                pass
+            while in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    chunk = in_flight.pop(future)
+                    CHUNKS_IN_FLIGHT.dec()
+                    await self.run_in_thread(document.release_pages, chunk)
+                    results, timings = future.result()
+                    for seconds in timings:
+                        PAGE_PARSE_SECONDS.observe(seconds, flavor=flavor)
+                    WORKER_BUSY_SECONDS.inc(sum(timings))
+                    await submit()
+                    yield results
+        finally:
+            CHUNKS_IN_FLIGHT.dec(len(in_flight))
+            for future in in_flight:
+                future.cancel()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+
+
+_default_engine = None
+
+def default_engine():
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = ExtractionEngine()
+    return _default_engine
@@ -0,0 +1,334 @@
+import os
+import csv
+import json
+import tempfile
+import pandas as pd
+from openpyxl import Workbook
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+TABLE_FORMATS = ["xlsx", "parquet", "feather", "csv"]
+ARROW_FORMATS = ["parquet", "feather"]
+
+MEDIA_TYPES = {
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".parquet": "application/vnd.apache.parquet",
+    ".feather": "application/vnd.apache.arrow.file",
+    ".csv": "text/csv",
+    ".json": "application/json",
+}
+
+
+def table_metadata(df, table_num, page_num):
+    # Camelot's metadata as attached to the frame by the engine worker
+    attrs = df.attrs
+    accuracy = attrs.get("accuracy")
+    whitespace = attrs.get("whitespace")
+    meta = {
+        "table": table_num,
+        "page": attrs.get("page", page_num),
+        "flavor": attrs.get("flavor"),
+        "bbox": attrs.get("bbox"),
+        "accuracy": float(accuracy) if accuracy is not None else None,
+        "whitespace": float(whitespace) if whitespace is not None else None,
+        "rows": int(df.shape[0]),
+        "columns": int(df.shape[1]),
+    }
+    # Tables stitched across page breaks list every page they span
+    if attrs.get("pages"):
+        meta["pages"] = attrs["pages"]
+    # Title row of a typed table, kept out of its typed columns
+    if attrs.get("header") is not None:
+        meta["header"] = attrs["header"]
+    return meta
+
+
+def header_cells(df, columns):
+    # The title row infer_types took out of a typed table, aligned on
+    # columns, or None when the table still has its titles in row 0
+    header = df.attrs.get("header")
+    if header is None:
+        return None
+    titles = dict(zip(df.columns, header))
+    return [titles.get(c) for c in columns]
+
+
+def format_available(output_format):
+    return output_format not in ARROW_FORMATS or pa is not None
+
+
+def make_writer(output_format, path, sheet_per_page=False):
+    if output_format == "xlsx":
+        return StreamingExcelWriter(path, sheet_per_page=sheet_per_page)
+    if output_format == "csv":
+        return StreamingCsvWriter(path)
+    if output_format in ARROW_FORMATS:
+        return ArrowTableWriter(path, output_format)
+    raise ValueError(f"Unknown output format '{output_format}'")
+
+
+class StreamingExcelWriter:
+    # Write-only openpyxl workbook. Rows are serialized to a temporary file
+    # as pages are appended, so peak memory does not grow with the document
+    # and nothing has to be concatenated first.
+    #
+    # Frames are aligned on their column labels the same way pd.concat
+    # aligns them. Rows already written cannot be changed, so when a table
+    # brings new columns a new header row naming every column so far is
+    # written above it.
+    #
+    # With sheet_per_page every page gets its own "page-{n}" sheet in the
+    # same workbook instead of being appended to a single sheet.
+    def __init__(self, path, sheet_name="Sheet1", sheet_per_page=False):
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.sheet_per_page = sheet_per_page
+        self.sheet = None if sheet_per_page else self.workbook.create_sheet(sheet_name)
+        self.columns = None
+        self.sheets = 0 if sheet_per_page else 1
+        self.tables = 0
+        self.rows = 0
+        self.paths = [path]
+
+    def write_page(self, page_num, frames):
+        if self.sheet_per_page:
+            self.sheet = self.workbook.create_sheet(f"page-{page_num}")
+            self.columns = None
+            self.sheets += 1
+        for df in frames:
+            self.write(df)
+
+    def write(self, df):
+        if self.columns is None:
+            self.columns = list(df.columns)
+            self.sheet.append(self.columns)
+        else:
+            added = [c for c in df.columns if c not in self.columns]
+            if added:
+                self.columns.extend(added)
+                self.sheet.append(self.columns)
+
+        titles = header_cells(df, self.columns)
+        if titles is not None:
+            self.sheet.append(titles)
+        aligned = df.reindex(columns=self.columns)
+        for row in aligned.itertuples(index=False, name=None):
+            self.sheet.append([None if pd.isna(value) else value for value in row])
+
+        self.tables += 1
+        self.rows += len(df)
+
+    def close(self):
+        self.workbook.save(self.path)
+
+    def discard(self):
+        # Finish each sheet's temporary XML stream and delete it unsaved
+        for sheet in self.workbook.worksheets:
+            if not sheet.closed:
+                sheet.close()
+            sheet._writer.cleanup()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class WorkbookPerPageWriter:
+    # One workbook per page with tables, numbered from 1 in page order.
+    # path_pattern is formatted with that number. Each workbook is saved as
+    # soon as its page is written.
+    def __init__(self, path_pattern):
+        self.path_pattern = path_pattern
+        self.sheets = 0
+        self.tables = 0
+        self.rows = 0
+        self.paths = []
+
+    def write_page(self, page_num, frames):
+        writer = StreamingExcelWriter(self.path_pattern.format(len(self.paths) + 1))
+        self.paths.append(writer.path)
+        writer.write_page(page_num, frames)
+        writer.close()
+        self.sheets += 1
+        self.tables += writer.tables
+        self.rows += writer.rows
+
+    def close(self):
+        pass
+
+    def discard(self):
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class StreamingCsvWriter:
+    # Rows go straight to disk as pages finish. Every row starts with its
+    # source page and table number, the rest of camelot's metadata (bbox,
+    # accuracy) is written to a "<path>.meta.json" sidecar on close.
+    # Columns are aligned like StreamingExcelWriter, a table that brings new
+    # columns gets a new header row naming every column so far.
+    def __init__(self, path):
+        self.path = path
+        self.meta_path = f"{path}.meta.json"
+        self._file = open(path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.writer(self._file)
+        self.columns = None
+        self.metadata = []
+        self.sheets = 1
+        self.tables = 0
+        self.rows = 0
+        self.paths = [path, self.meta_path]
+
+    def write_page(self, page_num, frames):
+        for df in frames:
+            self.write(df, page_num)
+
+    def write(self, df, page_num=None):
+        if self.columns is None:
+            self.columns = list(df.columns)
+            self._writer.writerow(["page", "table"] + [str(c) for c in self.columns])
+        else:
+            added = [c for c in df.columns if c not in self.columns]
+            if added:
+                self.columns.extend(added)
+                self._writer.writerow(["page", "table"] + [str(c) for c in self.columns])
+
+        self.tables += 1
+        meta = table_metadata(df, self.tables, page_num)
+        self.metadata.append(meta)
+
+        prefix = [meta["page"], meta["table"]]
+        titles = header_cells(df, self.columns)
+        if titles is not None:
+            self._writer.writerow(prefix + ["" if value is None else value for value in titles])
+        aligned = df.reindex(columns=self.columns)
+        self._writer.writerows(
+            prefix + ["" if pd.isna(value) else value for value in row]
+            for row in aligned.itertuples(index=False, name=None)
+        )
+        self.rows += len(df)
+
+    def close(self):
+        self._file.close()
+        with open(self.meta_path, "w") as f:
+            json.dump({"tables": self.metadata}, f, indent=2)
+
+    def discard(self):
+        self._file.close()
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def unified_schema(schemas):
+    # Union of every table's columns in first-seen order, with compatible
+    # types widened (int8 and int64 to int64, nulls to the other type)
+    try:
+        return pa.unify_schemas(schemas, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+
+    # Typed tables can disagree on a column (numbers on one page, text on
+    # the next), such columns are written as text
+    types = {}
+    for schema in schemas:
+        for field in schema:
+            if not pa.types.is_null(field.type):
+                types.setdefault(field.name, set()).add(field.type)
+    conflicts = {name for name, found in types.items() if len(found) > 1}
+    return pa.unify_schemas([
+        pa.schema([
+            field.with_type(pa.string()) if field.name in conflicts else field
+            for field in schema
+        ])
+        for schema in schemas
+    ], promote_options="permissive")
+
+
+def conform(table, schema):
+    # Table cast to schema, with all-null columns for the ones it lacks
+    columns = []
+    for field in schema:
+        i = table.schema.get_field_index(field.name)
+        if i < 0:
+            columns.append(pa.nulls(len(table), field.type))
+        else:
+            columns.append(table.column(i).cast(field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+class ArrowTableWriter:
+    # Parquet or Feather output through pyarrow (optional dependency, the
+    # "arrow" extra). Each table is converted to Arrow as its page arrives
+    # and appended to an anonymous temp file next to the output, so pages
+    # are not held in memory. close() unifies the tables' schemas and
+    # copies them into the output one table at a time, as Parquet row
+    # groups or Feather record batches. Rows carry "page" and "table"
+    # columns and the per-table metadata, a typed table's title row
+    # included, is stored as JSON under the "tables" key of the schema
+    # metadata.
+    def __init__(self, path, output_format="parquet"):
+        if pa is None:
+            raise ImportError(f"pyarrow is required for {output_format} output")
+        self.path = path
+        self.format = output_format
+        self._file = tempfile.TemporaryFile(prefix="extract-arrow-", dir=os.path.dirname(os.path.abspath(path)))
+        self.parts = []
+        self.metadata = []
+        self.sheets = 1
+        self.tables = 0
+        self.rows = 0
+        self.paths = [path]
+
+    def write_page(self, page_num, frames):
+        for df in frames:
+            self.write(df, page_num)
+
+    def write(self, df, page_num=None):
+        self.tables += 1
+        meta = table_metadata(df, self.tables, page_num)
+        self.metadata.append(meta)
+
+        data = df.copy()
+        data.columns = [str(c) for c in data.columns]
+        data.insert(0, "table", meta["table"])
+        data.insert(0, "page", meta["page"])
+        # pandas schema metadata would only describe the first table's columns
+        table = pa.Table.from_pandas(data, preserve_index=False).replace_schema_metadata(None)
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as stream:
+            stream.write_table(table)
+        offset = self._file.tell()
+        self._file.write(sink.getvalue())
+        self.parts.append((offset, self._file.tell() - offset, table.schema))
+        self.rows += len(df)
+
+    def read_parts(self):
+        for offset, length, _ in self.parts:
+            self._file.seek(offset)
+            yield pa.ipc.open_stream(self._file.read(length)).read_all()
+
+    def close(self):
+        schema = unified_schema([part_schema for _, _, part_schema in self.parts] or [pa.schema([])])
+        schema = schema.with_metadata({b"tables": json.dumps(self.metadata).encode()})
+        if self.format == "parquet":
+            writer = pq.ParquetWriter(self.path, schema)
+        else:
+            # Feather v2 is the Arrow IPC file format, lz4 as write_feather uses
+            writer = pa.ipc.new_file(self.path, schema, options=pa.ipc.IpcWriteOptions(compression="lz4"))
+        with writer:
+            for table in self.read_parts():
+                writer.write_table(conform(table, schema))
+        self._file.close()
+        self.parts = []
+
+    def discard(self):
+        self._file.close()
+        self.parts = []
+        if os.path.exists(self.path):
+            os.remove(self.path)
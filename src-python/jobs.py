@@ -0,0 +1,207 @@
+import uuid
+import asyncio
+import logging
+from datetime import datetime
+from progress import ProgressChannel
+
+logger = logging.getLogger(__name__)
+
+# Seconds a finished job can still be picked up by a progress stream that
+# was opened without a job ID or before its job was submitted
+REPLAY_WINDOW = 30
+
+
+class Job:
+    def __init__(self, filename, flavor, pages, options=None, job_id=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.filename = filename
+        self.flavor = flavor
+        self.pages = pages
+        self.options = options or {}
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = ProgressChannel()
+        # Every table is kept so late subscribers can replay the whole job,
+        # row previews are dropped once it finishes
+        self.tables = ProgressChannel(max_history=None)
+        self.task = None
+        self._done = asyncio.Event()
+
+    @property
+    def finished(self):
+        return self.status in ["completed", "failed", "cancelled", "interrupted"]
+
+    async def wait(self):
+        await self._done.wait()
+
+    def finish(self, status, result=None, error=None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = datetime.now()
+        self.progress.close()
+        self.tables.close()
+        # Finished jobs stay listed for a while, keep only each table's
+        # shape and metadata rather than up to preview_rows rows per table
+        self.tables.events = [
+            (event_id, {k: v for k, v in data.items() if k != "rows"})
+            for event_id, data in self.tables.events
+        ]
+        self._done.set()
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "flavor": self.flavor,
+            "pages": self.pages,
+            "options": self.options,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class JobManager:
+    # Bounded FIFO of jobs drained by a fixed number of scheduler tasks,
+    # which caps how many extractions run at the same time. listener, when
+    # given, is called with the job on every status change.
+    def __init__(self, runner, max_concurrent=2, max_queued=100, max_history=500, listener=None):
+        self.runner = runner
+        self.listener = listener
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_history = max_history
+        self.jobs = {}
+        self.queue = asyncio.Queue(maxsize=max_queued)
+        self._workers = []
+        self._submitted = asyncio.Event()
+        self._stopping = False
+
+    def start(self):
+        self._stopping = False
+        for _ in range(self.max_concurrent):
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        # Jobs cut short by a shutdown end up "interrupted", not "cancelled"
+        self._stopping = True
+        for job in self.jobs.values():
+            if not job.finished:
+                self.cancel(job.id)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, filename, flavor, pages, options=None, job_id=None):
+        # Reusing the ID of a finished job runs it again under that ID
+        existing = self.jobs.get(job_id) if job_id else None
+        if existing is not None and not existing.finished:
+            raise ValueError(f"Job {job_id} is still {existing.status}")
+
+        job = Job(filename, flavor, pages, options, job_id)
+        # Raises asyncio.QueueFull when the backlog is at capacity
+        self.queue.put_nowait(job)
+        self.jobs.pop(job.id, None)
+        self.jobs[job.id] = job
+        self._prune()
+        self._notify(job)
+
+        self._submitted.set()
+        self._submitted = asyncio.Event()
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        if job.task is not None:
+            job.task.cancel()
+        else:
+            # Still queued, the scheduler skips it when dequeued
+            job.finish("interrupted" if self._stopping else "cancelled")
+            self._notify(job)
+        return job
+
+    async def next_active_job(self):
+        # For progress streams opened without a job ID: attach to the newest
+        # unfinished job. Fast jobs (e.g. served from the cache) often finish
+        # before the client subscribes, so the most recently finished job is
+        # replayed when it ended within REPLAY_WINDOW. Otherwise wait for the
+        # next submission.
+        while True:
+            recent = None
+            for job in reversed(list(self.jobs.values())):
+                if not job.finished:
+                    return job
+                if recent is None or job.finished_at > recent.finished_at:
+                    recent = job
+            if recent is not None and (datetime.now() - recent.finished_at).total_seconds() <= REPLAY_WINDOW:
+                return recent
+            await self._submitted.wait()
+
+    async def wait_for_job(self, job_id, timeout=REPLAY_WINDOW):
+        # Clients that choose their own job ID may subscribe before the job
+        # is submitted, None once timeout seconds pass without it
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while job_id not in self.jobs:
+            try:
+                await asyncio.wait_for(self._submitted.wait(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                return None
+        return self.jobs[job_id]
+
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def running(self):
+        return sum(1 for job in self.jobs.values() if job.status == "running")
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.finished:
+                    continue
+                job.status = "running"
+                job.started_at = datetime.now()
+                self._notify(job)
+                job.task = asyncio.create_task(self.runner(job))
+                try:
+                    result = await job.task
+                    job.finish("failed" if result.get("error") else "completed", result, result.get("error"))
+                except asyncio.CancelledError:
+                    job.finish("interrupted" if self._stopping else "cancelled")
+                    # Re-raise only if the scheduler itself is being stopped
+                    if asyncio.current_task().cancelling():
+                        raise
+                except Exception as e:
+                    logger.exception("Error running job %s", job.id)
+                    job.finish("failed", error=str(e))
+                finally:
+                    self._notify(job)
+            finally:
+                self.queue.task_done()
+
+    def _notify(self, job):
+        if self.listener is None:
+            return
+        try:
+            self.listener(job)
+        except Exception:
+            logger.exception("Error recording job %s", job.id)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self.jobs) - self.max_history)]:
+            del self.jobs[job_id]
@@ -0,0 +1,77 @@
+import io
+import os
+import sys
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+LOG_BUFFER_SIZE = 64 * 1024
+
+_listener = None
+
+
+class BufferedStreamHandler(logging.StreamHandler):
+    # Writes without flushing, BatchingListener flushes once per burst of
+    # records instead of once per record
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class BatchingListener(QueueListener):
+    def dequeue(self, block):
+        if not block:
+            return self.queue.get_nowait()
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            # Queue drained, push out what the handlers have buffered
+            for handler in self.handlers:
+                handler.flush()
+            return self.queue.get()
+
+
+def log_stream():
+    # stderr is line buffered, give the handler a block-buffered view of the
+    # same descriptor so a burst of records is one write
+    try:
+        return io.open(
+            sys.stderr.fileno(), "w", buffering=LOG_BUFFER_SIZE,
+            encoding="utf-8", errors="backslashreplace", closefd=False
+        )
+    except (AttributeError, OSError, ValueError):
+        return sys.stderr
+
+
+def configure_logging(level=None):
+    # Log calls on the event loop and in the I/O threads only put the record
+    # on a queue, formatting and writing happen on the listener's thread
+    global _listener
+    if _listener is not None:
+        return
+
+    level = level or os.environ.get("LOG_LEVEL", "INFO")
+    handler = BufferedStreamHandler(log_stream())
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    root.addHandler(QueueHandler(records))
+
+    _listener = BatchingListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.flush()
+        _listener = None
@@ -1,20 +1,123 @@
 import os
-import shutil
+import re
 import time
+import hashlib
 import asyncio
 import json
+import logging
+import multiprocessing
+from contextlib import asynccontextmanager
 import uvicorn
 from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse
 from datetime import datetime
 from util import ExtractTable
-import pypdf
+from engine import ExtractionEngine, FLAVORS
+from jobs import JobManager
+from cache import ResultCache
+from export import make_writer, format_available, WorkbookPerPageWriter, TABLE_FORMATS, MEDIA_TYPES
+from registry import Registry
+from raster import RasterCache
+from checkpoint import CheckpointStore
+from document import count_pages, page_spec_items, parse_pages
+from logs import configure_logging
+import metrics
 from sse_starlette.sse import EventSourceResponse
-import traceback
-import pandas as pd
 
-app = FastAPI()
+logger = logging.getLogger("extract")
+
+# Shared services, built by setup() when the app starts rather than at
+# import: pool workers started with spawn, and the frozen PyInstaller
+# binary, import this module again and must not open the registry, scan
+# the caches or create a job manager of their own
+raster_cache = None
+engine = None
+cache = None
+checkpoints = None
+registry = None
+jobs = None
+job_records = None
+
+def setup():
+    global raster_cache, engine, cache, checkpoints, registry, jobs, job_records
+    os.makedirs(TEMP_DIR, exist_ok=True)
+
+    # Rendered lattice page images, reused across jobs on the same PDF
+    raster_cache = RasterCache(
+        os.environ.get("EXTRACT_RASTER_CACHE_DIR", "raster_cache"),
+        max_bytes=int(os.environ.get("EXTRACT_RASTER_CACHE_MAX_BYTES", 2 * 1024 ** 3)),
+        renderer=os.environ.get("EXTRACT_RASTER_BACKEND", "auto")
+    )
+
+    # Process pool used to fan pages out across cores
+    engine = ExtractionEngine(
+        workers=int(os.environ.get("EXTRACT_WORKERS", 0)) or None,
+        chunk_size=int(os.environ.get("EXTRACT_CHUNK_SIZE", 1)),
+        raster=raster_cache
+    )
+
+    # Per-page table results keyed on PDF content, reused across jobs
+    cache = ResultCache(
+        os.environ.get("EXTRACT_CACHE_DIR", "extraction_cache"),
+        max_bytes=int(os.environ.get("EXTRACT_CACHE_MAX_BYTES", 1024 ** 3)),
+        max_age=int(os.environ.get("EXTRACT_CACHE_MAX_AGE", 7 * 24 * 60 * 60))
+    )
+
+    # Finished pages of every unfinished job, so jobs survive a restart
+    checkpoints = CheckpointStore(os.environ.get("EXTRACT_CHECKPOINT_DIR", "checkpoints"))
+
+    # Index of uploads and generated files, replaces per-request directory scans
+    registry = Registry(os.environ.get("REGISTRY_PATH", "registry.db"))
+
+    # Extraction jobs are queued and at most MAX_CONCURRENT_JOBS run at once
+    jobs = JobManager(
+        run_extraction,
+        max_concurrent=int(os.environ.get("MAX_CONCURRENT_JOBS", 2)),
+        max_queued=int(os.environ.get("MAX_QUEUED_JOBS", 100)),
+        listener=record_job
+    )
+    # Checkpoint writes for job status changes, see record_job
+    job_records = asyncio.Queue()
+
+MAX_FILE_AGE = 24 * 60 * 60
+SWEEP_INTERVAL = int(os.environ.get("SWEEP_INTERVAL", 15 * 60))
+
+async def sweep_expired_files():
+    while True:
+        try:
+            removed = await engine.run_in_thread(registry.expire, MAX_FILE_AGE)
+            if removed:
+                logger.info("Removed %d expired files", removed)
+            await engine.run_in_thread(checkpoints.expire, MAX_FILE_AGE)
+            trimmed = await engine.run_in_thread(raster_cache.trim)
+            if trimmed:
+                logger.info("Trimmed %d cached page images", trimmed)
+        except Exception:
+            logger.exception("Error sweeping expired files")
+        await asyncio.sleep(SWEEP_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    setup()
+    # Files left over from before the registry existed are only found by a scan
+    await engine.run_in_thread(clean_old_pdfs)
+    await engine.run_in_thread(clean_old_excels)
+    sweeper = asyncio.create_task(sweep_expired_files())
+    recorder = asyncio.create_task(write_job_records())
+    jobs.start()
+    resume_jobs()
+    yield
+    sweeper.cancel()
+    await jobs.stop()
+    # Interrupted jobs must reach their checkpoints to be resumed
+    await job_records.join()
+    recorder.cancel()
+    engine.shutdown()
+    registry.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -26,18 +129,6 @@ app.add_middleware(
 )
 
 TEMP_DIR = "temp_pdfs"
-os.makedirs(TEMP_DIR, exist_ok=True)
-
-
-# Create global progress queue
-progress_queue = asyncio.Queue()
-
-async def clear_progress_queue():
-    try:
-        while not progress_queue.empty():
-            await progress_queue.get()
-    except Exception as e:
-        print(f"Error clearing progress queue: {str(e)}")
 
 def clean_old_pdfs():
     now = time.time()
@@ -45,7 +136,7 @@ def clean_old_pdfs():
         file_path = os.path.join(TEMP_DIR, filename)
         if os.path.isfile(file_path):
             file_age = now - os.path.getmtime(file_path)
-            if file_age > 24 * 60 * 60:
+            if file_age > MAX_FILE_AGE:
                 os.remove(file_path)
 
 def clean_old_excels():
@@ -53,73 +144,91 @@ def clean_old_excels():
     for filename in os.listdir("."):
         if filename.endswith(".xlsx"):
             file_age = now - os.path.getmtime(filename)
-            if file_age > 24 * 60 * 60:
+            if file_age > MAX_FILE_AGE:
                 os.remove(filename)
 
-@app.get('/extraction-progress')
-async def extraction_progress(request: Request):
-    async def event_generator():
-        try:
-            while True:
-                if await request.is_disconnected():
-                    print("Client disconnected")
-                    break
-
-                try:
-                    # Get progress update with timeout
-                    progress = await asyncio.wait_for(
-                        progress_queue.get(),
-                        timeout=0.5
-                    )
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
-                    # If we receive a special cleanup message, break the loop
-                    if progress.get("type") == "cleanup":
-                        break
+def store_upload(source, filename):
+    # Copies the upload in 1 MiB chunks while hashing it, then either keeps
+    # the new file or drops it in favour of an identical earlier upload
+    start = time.perf_counter()
+    file_path = os.path.join(TEMP_DIR, filename)
+    partial_path = f"{file_path}.part"
+    digest = hashlib.sha256()
+    with open(partial_path, "wb") as buffer:
+        for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            buffer.write(chunk)
+            metrics.UPLOAD_BYTES.inc(len(chunk))
+    content_hash = digest.hexdigest()
+
+    existing = registry.find_upload(content_hash)
+    if existing is not None:
+        os.remove(partial_path)
+        registry.touch_upload(existing["filename"])
+        metrics.UPLOAD_SECONDS.observe(time.perf_counter() - start)
+        return existing["filename"], existing["total_pages"], True
+
+    os.replace(partial_path, file_path)
+    total_pages = count_pages(file_path)
+    registry.add_upload(filename, file_path, total_pages, content_hash)
+    metrics.UPLOAD_SECONDS.observe(time.perf_counter() - start)
+    return filename, total_pages, False
 
-                    yield {
-                        "event": "message",
-                        "retry": 500,
-                        "data": json.dumps(progress)
-                    }
+@app.get('/extraction-progress')
+async def extraction_progress(request: Request, job_id: str = None):
+    if job_id is not None and await jobs.wait_for_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
 
-                    # Exit after completion message
-                    if progress.get("type") == "completion":
-                        await asyncio.sleep(0.2)
-                        break
+    # Browsers send Last-Event-ID when an EventSource reconnects
+    try:
+        last_event_id = int(request.headers.get("last-event-id", 0))
+    except ValueError:
+        last_event_id = 0
 
-                except asyncio.TimeoutError:
-                    yield {
-                        "event": "keepalive",
-                        "data": json.dumps({"type": "keepalive"})
-                    }
+    async def event_generator():
+        try:
+            job = jobs.get(job_id) if job_id else await jobs.next_active_job()
 
-                await asyncio.sleep(0.1)
+            async for event_id, progress in job.progress.subscribe(last_event_id):
+                if await request.is_disconnected():
+                    logger.debug("Client disconnected")
+                    return
+
+                yield {
+                    "id": str(event_id),
+                    "event": "message",
+                    "retry": 500,
+                    "data": json.dumps(progress)
+                }
+
+            # Explicit end-of-stream marker, sent once the job's channel is
+            # closed so clients never have to guess from timing
+            yield {
+                "event": "end",
+                "data": json.dumps({"type": "end", "job_id": job.id, "status": job.status})
+            }
 
-        except Exception as e:
-            print(f"Error in event generator: {str(e)}")
-            print(traceback.format_exc())
+        except Exception:
+            logger.exception("Error in event generator")
 
-    return EventSourceResponse(event_generator())
+    # sse-starlette sends its own keepalive pings while no event is pending
+    return EventSourceResponse(event_generator(), ping=5)
 
 
 @app.post("/upload-pdf")
 async def upload_pdf(file: UploadFile = File(...)):
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    filename = f"{timestamp}_{file.filename}"
-    file_path = os.path.join(TEMP_DIR, filename)
-
-    clean_old_pdfs()
-
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    with open(file_path, 'rb') as f:
-        pdf_reader = pypdf.PdfReader(f)
-        total_pages = len(pdf_reader.pages)
+    # Microseconds so two uploads of the same name in one second can't collide
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    filename, total_pages, duplicate = await engine.run_in_thread(
+        store_upload, file.file, f"{timestamp}_{file.filename}"
+    )
 
     return {
         "filename": filename,
-        "message": "PDF uploaded successfully",
+        "message": "PDF already uploaded" if duplicate else "PDF uploaded successfully",
+        "duplicate": duplicate,
         "documentURL": f"http://localhost:8008/pdf/{filename}",
         "totalPages": total_pages
     }
@@ -131,18 +240,37 @@ async def get_pdf(filename: str):
         raise HTTPException(status_code=404, detail="PDF not found")
     return FileResponse(file_path, media_type="application/pdf", filename=filename)
 
-@app.post("/extract-tables")
-async def extract_tables(filename: str, flavor: str = "lattice", pages: str = "all"):
-    clean_old_excels()
+OUTPUT_MODES = ["files", "workbook"]
+TABLE_STREAM_FORMATS = ["ndjson", "sse"]
+TABLE_PREVIEW_ROWS = int(os.environ.get("TABLE_PREVIEW_ROWS", 100))
+# Per job, table data held past this many bytes is spilled to EXTRACT_SPILL_DIR
+MEMORY_LIMIT = int(os.environ.get("EXTRACT_MEMORY_LIMIT", 0)) or None
+SPILL_DIR = os.environ.get("EXTRACT_SPILL_DIR") or None
+
+async def run_extraction(job):
+    filename, flavor, pages = job.filename, job.flavor, job.pages
+    output = job.options.get("output", "files")
+    output_format = job.options.get("format", "xlsx")
+    prescan = job.options.get("prescan", False)
+    progress_queue = job.progress
     session_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
     file_path = os.path.join(TEMP_DIR, filename)
     if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="PDF not found")
+        raise FileNotFoundError(f"PDF not found: {filename}")
+
+    # Outputs are streamed to disk as pages finish. Separate page selections
+    # still get one workbook per page unless the single-workbook output was
+    # requested. Non-Excel formats always go to one file, their rows carry
+    # the source page.
+    output_file = f"{session_id}_{filename}.{output_format}"
+    if output == "workbook":
+        writer = make_writer(output_format, output_file, sheet_per_page=True)
+    elif ',' in pages and output_format == "xlsx":
+        writer = WorkbookPerPageWriter(f"{session_id}_{filename}_{{}}.xlsx")
+    else:
+        writer = make_writer(output_format, output_file)
 
     try:
-        # Clear the progress queue before starting new extraction
-        await clear_progress_queue()
-
         # Initial progress update
         await progress_queue.put({
             "type": "progress",
@@ -153,36 +281,20 @@ async def extract_tables(filename: str, flavor: str = "lattice", pages: str = "a
             "timestamp": datetime.now().isoformat()
         })
 
-        # add small delay
-        await asyncio.sleep(0.3)
-
-        extractor = ExtractTable(file_path, progress_queue)
-
-        # Extract tables based on page selection
-        if pages == "all":
-            tables = await extractor.extract_table_from_pdf(flavor=flavor, pages=pages)
-        elif ',' in pages:
-                    # Handle comma-separated pages
-            page_numbers = [int(p.strip()) for p in pages.split(',')]
-            tables = []
-            for page_num in page_numbers:
-                page_tables = await extractor.extract_table_by_page(page_num, flavor=flavor)
-                if isinstance(page_tables, pd.DataFrame) and not page_tables.empty:
-                    tables.append(page_tables)
-                elif isinstance(page_tables, list):
-                    tables.extend([t for t in page_tables if isinstance(t, pd.DataFrame) and not t.empty])
-        elif '-' in pages:
-            start, end = map(int, pages.split('-'))
-            tables = await extractor.extract_table_by_range(start, end, flavor=flavor)
-        else:
-            try:
-                page_num = int(pages)
-                tables = await extractor.extract_table_by_page(page_num, flavor=flavor)
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid pages parameter")
+        extractor = ExtractTable(
+            file_path, progress_queue, engine=engine, cache=cache, sink=writer, prescan=prescan,
+            checkpoint=checkpoints.for_job(job.id), results=job.tables, preview_rows=TABLE_PREVIEW_ROWS,
+            memory_limit=MEMORY_LIMIT, spill_dir=SPILL_DIR, typed=job.options.get("types", False),
+            stitch=job.options.get("stitch", False)
+        )
+
+        # Every page selection is parsed into one sorted batch of pages
+        await extractor.extract_table_from_pdf(flavor=flavor, pages=pages)
+        skipped_pages = extractor.skipped_pages
 
         # Handle case where no tables were found
-        if tables is None or (isinstance(tables, pd.DataFrame) and tables.empty):
+        if not extractor.tables_found:
+            writer.discard()
             await progress_queue.put({
                 "type": "completion",
                 "message": "No tables found in the specified pages",
@@ -193,59 +305,43 @@ async def extract_tables(filename: str, flavor: str = "lattice", pages: str = "a
                 "extractionComplete": True,
                 "tables": 0
             })
-            return {
+            result = {
                 "filename": filename,
                 "message": "No tables found in the specified pages",
                 "number_of_tables": 0,
                 "success": False
             }
-
-        # Process extracted tables
-        excel_files = []
-        if isinstance(tables, list):
-            num_tables = 0
-            total_tables = sum(1 for t in tables if isinstance(t, pd.DataFrame) and not t.empty)
-
-            for i, table in enumerate(tables):
-                if not isinstance(table, pd.DataFrame) or table.empty:
-                    continue
-
-                output_file = f"{session_id}_{filename}_{i+1}.xlsx"
-                output_path = os.path.join(output_file)
-                table.to_excel(output_path, index=False)
-                excel_files.append(output_file)
-                num_tables += 1
-
-                await progress_queue.put({
-                    "type": "progress",
-                    "message": f"Saved table {num_tables} of {total_tables} to Excel",
-                    "percentage": (num_tables / total_tables) * 100,
-                    "processed": num_tables,
-                    "total": total_tables,
-                    "timestamp": datetime.now().isoformat()
-                })
-
-                await asyncio.sleep(0.2)
+            if prescan:
+                result["skipped_pages"] = skipped_pages
+            if extractor.resumed_pages:
+                result["resumed_pages"] = extractor.resumed_pages
+            return result
+
+        with metrics.EXPORT_SECONDS.time(format=output_format):
+            await engine.run_in_thread(writer.close)
+        excel_files = list(writer.paths)
+        # Workbooks count their sheets, csv and Arrow files their tables
+        num_tables = writer.sheets if output_format == "xlsx" else writer.tables
+
+        if output_format != "xlsx":
+            message = f"Saved {num_tables} tables to {output_format}"
+        elif isinstance(writer, WorkbookPerPageWriter):
+            message = f"Saved {num_tables} workbooks"
+        elif num_tables == 1:
+            message = "Saved table to Excel"
         else:
-            output_file = f"{session_id}_{filename}.xlsx"
-            output_path = os.path.join(output_file)
-            tables.to_excel(output_path, index=False)
-            excel_files.append(output_file)
-            num_tables = 1
-
-
-            await progress_queue.put({
-                "type": "progress",
-                "message": "Saved table to Excel",
-                "percentage": 95,
-                "processed": 1,
-                "total": 1,
-                "timestamp": datetime.now().isoformat()
-            })
+            message = f"Saved {num_tables} sheets to one workbook"
+        await progress_queue.put({
+            "type": "progress",
+            "message": message,
+            "percentage": 95,
+            "processed": 1,
+            "total": 1,
+            "timestamp": datetime.now().isoformat()
+        })
 
-            await asyncio.sleep(0.1)
+        registry.add_artifacts(session_id, job.id, filename, excel_files)
 
-        await asyncio.sleep(0.2)
         # Final completion message
         await progress_queue.put({
             "type": "completion",
@@ -258,9 +354,7 @@ async def extract_tables(filename: str, flavor: str = "lattice", pages: str = "a
             "tables": num_tables
         })
 
-        await asyncio.sleep(0.3)
-
-        return {
+        result = {
             "filename": filename,
             "message": "Tables extracted successfully",
             "tablesURL": f"http://localhost:8008/excel/{filename}",
@@ -268,12 +362,22 @@ async def extract_tables(filename: str, flavor: str = "lattice", pages: str = "a
             "success": True,
             "excel_files": excel_files
         }
+        if prescan:
+            result["skipped_pages"] = skipped_pages
+        if extractor.resumed_pages:
+            result["resumed_pages"] = extractor.resumed_pages
+        if extractor.typed:
+            result["memory"] = extractor.memory_report()
+        return result
+
+    except asyncio.CancelledError:
+        writer.discard()
+        raise
 
     except Exception as e:
-        print(f"Error in extract_tables: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in run_extraction")
 
-        await asyncio.sleep(0.1)
+        writer.discard()
 
         await progress_queue.put({
             "type": "error",
@@ -292,47 +396,246 @@ async def extract_tables(filename: str, flavor: str = "lattice", pages: str = "a
             "error": str(e)
         }
 
-@app.get("/excel/{filename}")
-async def get_excel(filename: str):
-    files = []
+def record_job(job):
+    # Completed jobs have nothing left to resume, everything else keeps its
+    # checkpoint until it expires
+    if job.finished:
+        metrics.JOBS.inc(status=job.status)
+        if job.started_at is not None:
+            metrics.JOB_SECONDS.observe((job.finished_at - job.started_at).total_seconds(), status=job.status)
+
+    # Called on the event loop, the disk work is left to write_job_records
+    job_records.put_nowait((job.id, job.status == "completed", job.to_dict()))
+
+async def write_job_records():
+    # One task applies the writes in order, so a job's checkpoint never ends
+    # up with an older status than the last one recorded
+    while True:
+        job_id, completed, job_data = await job_records.get()
+        try:
+            checkpoint = checkpoints.for_job(job_id)
+            if completed:
+                await engine.run_in_thread(checkpoint.discard)
+            else:
+                await engine.run_in_thread(checkpoint.save_job, job_data)
+        except Exception:
+            logger.exception("Error recording job %s", job_id)
+        finally:
+            job_records.task_done()
+
+def resume_jobs():
+    # Jobs that were queued or running when the server last stopped, whether
+    # it shut down cleanly or was killed, continue under their old IDs
+    for job_data in checkpoints.resumable_jobs():
+        job_id = job_data["job_id"]
+        if not os.path.exists(os.path.join(TEMP_DIR, job_data["filename"])):
+            checkpoints.for_job(job_id).discard()
+            continue
+        try:
+            jobs.submit(job_data["filename"], job_data["flavor"], job_data["pages"], job_data["options"], job_id=job_id)
+            logger.info("Resuming job %s", job_id)
+        except asyncio.QueueFull:
+            logger.warning("Job queue full, job %s left for a manual resume", job_id)
+            break
+
+# Read at scrape time from the components that already keep these numbers
+metrics.registry.gauge("jobs_queued", "Jobs waiting for a scheduler slot", callback=lambda: jobs.queue_depth())
+metrics.registry.gauge("jobs_running", "Jobs currently extracting", callback=lambda: jobs.running())
+metrics.registry.gauge("extract_workers", "Size of the page parsing process pool", callback=lambda: engine.workers)
+metrics.registry.counter("result_cache_hits_total", "Page results served from the cache",
+                         callback=lambda: cache.stats()["hits"])
+metrics.registry.counter("result_cache_misses_total", "Page lookups that missed the cache",
+                         callback=lambda: cache.stats()["misses"])
+metrics.registry.gauge("result_cache_bytes", "Size of the result cache on disk",
+                       callback=lambda: cache.stats()["size_bytes"])
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+def submit_job(filename, flavor, pages, output="files", prescan=False, output_format="xlsx", types=False,
+               stitch=False, job_id=None):
+    if not os.path.exists(os.path.join(TEMP_DIR, filename)):
+        raise HTTPException(status_code=404, detail="PDF not found")
+    if flavor not in FLAVORS:
+        raise HTTPException(status_code=400, detail=f"flavor must be one of {FLAVORS}")
+    if output not in OUTPUT_MODES:
+        raise HTTPException(status_code=400, detail=f"output must be one of {OUTPUT_MODES}")
+    # Checked against the page count when the upload is registered, the job
+    # checks again against the file itself
+    total_pages = registry.upload_pages(filename)
+    try:
+        if total_pages:
+            parse_pages(pages, total_pages)
+        else:
+            page_spec_items(pages)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if output_format not in TABLE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {TABLE_FORMATS}")
+    if not format_available(output_format):
+        raise HTTPException(status_code=400, detail=f"{output_format} output needs pyarrow installed")
+    # Job IDs name checkpoint directories, so only the generated form is accepted
+    if job_id is not None and not JOB_ID_PATTERN.match(job_id):
+        raise HTTPException(status_code=400, detail="job_id must be 32 lowercase hex characters")
+    try:
+        return jobs.submit(filename, flavor, pages, {
+            "output": output, "prescan": prescan, "format": output_format, "types": types,
+            "stitch": stitch
+        }, job_id=job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=429, detail="Too many queued extraction jobs")
 
-    # Get all Excel files matching the base filename
-    all_matching_files = [f for f in os.listdir() if f.endswith(".xlsx") and filename in f]
+@app.post("/extract-tables")
+async def extract_tables(filename: str, flavor: str = "lattice", pages: str = "all", output: str = "files",
+                         prescan: bool = False, format: str = "xlsx", types: bool = False,
+                         stitch: bool = False, job_id: str = None):
+    # Blocking variant kept for the desktop UI, still goes through the
+    # scheduler. The UI picks job_id itself so it can subscribe to the
+    # job's progress while this request is still waiting.
+    job = submit_job(filename, flavor, pages, output, prescan, format, types, stitch, job_id)
+    await job.wait()
+
+    if job.result is not None:
+        return job.result
+    return {
+        "filename": filename,
+        "message": "Extraction cancelled" if job.status == "cancelled" else f"Error during extraction: {job.error}",
+        "number_of_tables": 0,
+        "success": False,
+        "error": job.error or job.status
+    }
 
-    if not all_matching_files:
-        raise HTTPException(status_code=404, detail="Excel file not found")
+@app.post("/jobs")
+async def create_job(filename: str, flavor: str = "lattice", pages: str = "all", output: str = "files",
+                     prescan: bool = False, format: str = "xlsx", types: bool = False,
+                     stitch: bool = False):
+    job = submit_job(filename, flavor, pages, output, prescan, format, types, stitch)
+    return {
+        **job.to_dict(),
+        "statusURL": f"http://localhost:8008/jobs/{job.id}",
+        "progressURL": f"http://localhost:8008/extraction-progress?job_id={job.id}",
+        "tablesURL": f"http://localhost:8008/jobs/{job.id}/tables",
+        "resultURL": f"http://localhost:8008/jobs/{job.id}/result"
+    }
+
+@app.get("/jobs")
+async def list_jobs():
+    return {
+        "jobs": [job.to_dict() for job in jobs.jobs.values()],
+        "queued": jobs.queue_depth(),
+        "running": jobs.running(),
+        "max_concurrent": jobs.max_concurrent
+    }
 
-    # Group files by session ID (first part before the filename)
-    session_groups = {}
-    for file in all_matching_files:
-        session_id = file.split('_')[0]  # Get session ID
-        if session_id not in session_groups:
-            session_groups[session_id] = []
-        session_groups[session_id].append(file)
-
-    # Get most recent session (highest timestamp)
-    latest_session = max(session_groups.keys())
-    session_files = session_groups[latest_session]
-
-    # Sort files using the original numbering pattern
-    single_file = f"{latest_session}_{filename}.xlsx"
-    first_file = f"{latest_session}_{filename}_1.xlsx"
-
-    # Check for single file or first numbered file
-    if single_file in session_files:
-        files.append(single_file)
-    elif first_file in session_files:
-        files.append(first_file)
-
-        # Check for additional numbered files
-        num_files = 2
-        while True:
-            next_file = f"{latest_session}_{filename}_{num_files}.xlsx"
-            if next_file not in session_files:
-                break
-            files.append(next_file)
-            num_files += 1
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/tables")
+async def stream_job_tables(request: Request, job_id: str, format: str = "ndjson", after: int = 0):
+    # One event per table as soon as its page is parsed: page, index on the
+    # page, shape and the first TABLE_PREVIEW_ROWS rows. Events already sent
+    # are replayed, pass after=<id> (or Last-Event-ID for SSE) to skip them.
+    # Once the job has finished, replayed events no longer carry rows.
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if format not in TABLE_STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {TABLE_STREAM_FORMATS}")
+
+    if format == "sse":
+        try:
+            after = int(request.headers.get("last-event-id", after))
+        except ValueError:
+            pass
+
+    async def events():
+        async for event_id, table in job.tables.subscribe(after):
+            if await request.is_disconnected():
+                return
+            yield event_id, table
+        yield None, {"type": "end", "job_id": job.id, "status": job.status}
+
+    if format == "sse":
+        async def sse_events():
+            async for event_id, data in events():
+                event = {"event": data["type"], "data": json.dumps(data, default=str)}
+                if event_id is not None:
+                    event["id"] = str(event_id)
+                yield event
+        return EventSourceResponse(sse_events(), ping=5)
+
+    async def ndjson_lines():
+        async for event_id, data in events():
+            yield json.dumps({"id": event_id, **data}, default=str) + "\n"
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not job.finished:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return {**job.to_dict(), "result": job.result}
+
+@app.post("/jobs/{job_id}/resume")
+async def resume_job(job_id: str):
+    # Runs a failed, cancelled or interrupted job again under the same ID,
+    # pages in its checkpoint are not parsed again
+    job = jobs.get(job_id)
+    checkpoint = checkpoints.for_job(job_id)
+    if job is not None:
+        job_data = job.to_dict()
+    else:
+        job_data = checkpoint.load_job()
+    if job_data is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job_data["status"] == "completed":
+        raise HTTPException(status_code=409, detail="Job already completed")
+    if not os.path.exists(os.path.join(TEMP_DIR, job_data["filename"])):
+        raise HTTPException(status_code=404, detail="PDF not found")
+
+    try:
+        job = jobs.submit(job_data["filename"], job_data["flavor"], job_data["pages"], job_data["options"], job_id=job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=429, detail="Too many queued extraction jobs")
+    return {**job.to_dict(), "checkpointed_pages": len(checkpoint.completed_pages())}
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return cache.stats()
+
+@app.get("/excel/{filename}")
+async def get_excel(filename: str):
+    # Files of the most recent extraction of this PDF, in table order
+    files = registry.latest_session_files(filename)
+    if not files:
+        raise HTTPException(status_code=404, detail="Excel file not found")
+    return {"files": files}
 
+@app.get("/jobs/{job_id}/files")
+async def get_job_files(job_id: str):
+    files = registry.job_files(job_id)
+    if not files and jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
     return {"files": files}
 
 
@@ -344,9 +647,11 @@ async def download_file(filename: str):
 
     return FileResponse(
         file_path,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        media_type=MEDIA_TYPES.get(os.path.splitext(filename)[1], "application/octet-stream"),
         filename=filename
     )
 
 if __name__ == "__main__":
+    # Needed for the process pool in the frozen PyInstaller binary
+    multiprocessing.freeze_support()
     uvicorn.run(app, host="0.0.0.0", port=8008)
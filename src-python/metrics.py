@@ -0,0 +1,167 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Small in-process metrics registry rendered in the Prometheus text format
+# by GET /metrics. Everything is updated from the event loop or the I/O
+# threads, so each metric guards its values with a lock.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    # Incremented directly, or read from a callback at scrape time for
+    # values another component already counts (e.g. ResultCache.hits)
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=(), callback=None):
+        super().__init__(name, help_text, labels)
+        self.callback = callback
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        if self.callback is not None:
+            try:
+                values = [((), self.callback())]
+            except Exception:
+                values = []
+        else:
+            with self._lock:
+                values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{format_labels(self.label_names, key)} {format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = format_labels(self.label_names, key, [("le", format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=(), callback=None):
+        return self.add(Counter(name, help_text, labels, callback))
+
+    def gauge(self, name, help_text, labels=(), callback=None):
+        return self.add(Gauge(name, help_text, labels, callback))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.add(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+UPLOAD_SECONDS = registry.histogram("pdf_upload_seconds", "Time to receive, hash and register an upload")
+UPLOAD_BYTES = registry.counter("pdf_upload_bytes_total", "Bytes received by /upload-pdf")
+PAGE_PARSE_SECONDS = registry.histogram(
+    "page_parse_seconds", "Camelot time per page inside a pool worker", labels=("flavor",)
+)
+PAGES = registry.counter(
+    "pages_total", "Pages handled, by where the result came from", labels=("source",)
+)
+TABLES = registry.counter("tables_extracted_total", "Tables returned by camelot")
+PAGES_SPILLED = registry.counter("pages_spilled_total", "Pages written to a spill file past the memory limit")
+POSTPROCESS_SECONDS = registry.histogram("postprocess_seconds", "Arabic normalisation time per call")
+TYPING_SECONDS = registry.histogram("type_inference_seconds", "Column type inference time per page")
+CONCAT_SECONDS = registry.histogram("concat_seconds", "Time to concatenate a document's tables")
+EXPORT_SECONDS = registry.histogram("export_seconds", "Time to finish writing an output file", labels=("format",))
+JOB_SECONDS = registry.histogram("job_seconds", "Extraction job wall time", labels=("status",))
+JOBS = registry.counter("jobs_total", "Finished extraction jobs", labels=("status",))
+WORKER_BUSY_SECONDS = registry.counter(
+    "worker_busy_seconds_total", "Time pool workers spent parsing, divide the rate by worker count for utilisation"
+)
+CHUNKS_IN_FLIGHT = registry.gauge("worker_chunks_in_flight", "Page chunks submitted to the pool and not yet returned")
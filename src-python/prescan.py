@@ -0,0 +1,105 @@
+import re
+from collections import Counter
+import pypdf
+
+# Strings and inline images are dropped before tokenizing so their bytes
+# can't be mistaken for operators
+LITERAL_STRING = re.compile(rb'\((?:\\.|[^\\()])*\)', re.S)
+HEX_STRING = re.compile(rb'<[0-9A-Fa-f\s]*>')
+INLINE_IMAGE = re.compile(rb'\bBI\b.*?\bEI\b', re.S)
+TOKEN = re.compile(rb'[-+]?(?:\d+\.?\d*|\.\d+)|[A-Za-z\'"*]+')
+
+MIN_RULING_OPS = 4
+MIN_TEXT_OPS = 6
+MIN_ALIGNED_COLUMNS = 3
+
+
+def page_content(page):
+    # Page content plus the content of form XObjects it draws, which is
+    # where some generators put their tables
+    contents = page.get_contents()
+    data = [contents.get_data()] if contents is not None else []
+
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources is not None else None
+    if xobjects is not None:
+        for xobject in xobjects.get_object().values():
+            xobject = xobject.get_object()
+            if xobject.get("/Subtype") == "/Form":
+                data.append(xobject.get_data())
+    return b"\n".join(data)
+
+
+def page_signals(data):
+    data = INLINE_IMAGE.sub(b" ", data)
+    data = LITERAL_STRING.sub(b" () ", data)
+    data = HEX_STRING.sub(b" () ", data)
+
+    rects = lines = text_ops = 0
+    line_x = 0.0
+    text_starts = Counter()
+    operands = []
+
+    for token in TOKEN.findall(data):
+        if token[:1].isdigit() or token[:1] in b"-+.":
+            operands.append(float(token))
+            continue
+
+        op = token
+        if op == b"re":
+            rects += 1
+        elif op == b"l":
+            lines += 1
+        elif op == b"BT":
+            line_x = 0.0
+        elif op in (b"Td", b"TD") and len(operands) >= 2:
+            line_x += operands[-2]
+        elif op == b"Tm" and len(operands) >= 6:
+            line_x = operands[-2]
+        elif op in (b"Tj", b"TJ", b"'", b'"'):
+            text_ops += 1
+            text_starts[round(line_x)] += 1
+        operands = []
+
+    aligned_columns = sum(1 for count in text_starts.values() if count >= 3)
+    return {
+        "rects": rects,
+        "lines": lines,
+        "text_ops": text_ops,
+        "aligned_columns": aligned_columns,
+    }
+
+
+def has_ruling_lines(page_path):
+    # Cheap lattice-or-stream check on a single split page file
+    with open(page_path, 'rb') as f:
+        page = pypdf.PdfReader(f, strict=False).pages[0]
+        signals = page_signals(page_content(page))
+    return signals["rects"] + signals["lines"] >= MIN_RULING_OPS
+
+
+def likely_has_table(signals, flavor):
+    if signals["text_ops"] < MIN_TEXT_OPS:
+        return False  # Blank or image-only, camelot finds nothing there
+    ruled = signals["rects"] + signals["lines"] >= MIN_RULING_OPS
+    if flavor == "lattice":
+        return ruled
+    return ruled or signals["aligned_columns"] >= MIN_ALIGNED_COLUMNS
+
+
+def find_table_pages(document, pages, flavor):
+    # Returns the subset of pages worth running camelot on. A page whose
+    # content can't be read is kept, the scan should never lose tables.
+    candidates = []
+    for page_num in pages:
+        if not 1 <= page_num <= document.total_pages:
+            candidates.append(page_num)  # Left for split_pages to reject
+            continue
+        try:
+            signals = page_signals(page_content(document.reader.pages[page_num - 1]))
+        except Exception:
+            candidates.append(page_num)
+            continue
+        if likely_has_table(signals, flavor):
+            candidates.append(page_num)
+    return candidates
@@ -0,0 +1,66 @@
+import asyncio
+
+
+class ProgressChannel:
+    # Append-only event log for one job. Publishing never blocks and every
+    # subscriber reads the log independently, so watchers don't steal events.
+    # max_history=None keeps every event.
+    def __init__(self, max_history=500):
+        self.max_history = max_history
+        self.events = []
+        self.last_id = 0
+        self.closed = False
+        self._changed = asyncio.Event()
+
+    async def put(self, data):
+        # Same call ExtractTable makes on an asyncio.Queue
+        self.publish(data)
+
+    def publish(self, data):
+        self.last_id += 1
+        self.events.append((self.last_id, data))
+        if self.max_history is not None and len(self.events) > self.max_history:
+            del self.events[:len(self.events) - self.max_history]
+
+        # Wake every waiting subscriber at once
+        self._changed.set()
+        self._changed = asyncio.Event()
+        return self.last_id
+
+    def close(self):
+        self.closed = True
+        self._changed.set()
+
+    def since(self, last_event_id):
+        if not self.events:
+            return []
+        first_id = self.events[0][0]
+        return self.events[max(0, last_event_id - first_id + 1):]
+
+    async def subscribe(self, last_event_id=0):
+        cursor = last_event_id
+        while True:
+            pending = self.since(cursor)
+            if not pending:
+                if self.closed:
+                    return
+                await self._changed.wait()
+                continue
+
+            for event_id, data in coalesce(pending):
+                yield event_id, data
+            cursor = pending[-1][0]
+
+
+def coalesce(events):
+    # A slow subscriber only needs the newest of several queued progress
+    # updates, every other event type is delivered as is
+    latest_progress = None
+    for event_id, data in events:
+        if data.get("type") == "progress":
+            latest_progress = event_id
+
+    return [
+        (event_id, data) for event_id, data in events
+        if data.get("type") != "progress" or event_id == latest_progress
+    ]
@@ -0,0 +1,142 @@
+import os
+import re
+import shutil
+import hashlib
+import tempfile
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+PAGE_NAME = re.compile(r'page-(\d+)\.pdf$')
+
+# Resolution camelot's Lattice assumes when it calls backend.convert
+DEFAULT_DPI = 300
+
+_renderers = {}
+
+
+def renderer_name(name):
+    if name == "auto":
+        return "pdfium" if pdfium is not None else "ghostscript"
+    return name
+
+
+def get_renderer(name):
+    # Renderer objects are reused within a worker process, but neither holds
+    # anything warm between pages: pdfium opens every page file afresh and
+    # camelot's Ghostscript backend builds a new converter on every convert
+    if name not in _renderers:
+        name_to_build = renderer_name(name)
+        if name_to_build == "pdfium":
+            if pdfium is None:
+                raise ImportError("pypdfium2 is required for the pdfium raster backend")
+            _renderers[name] = PdfiumRenderer()
+        else:
+            from camelot.backends.image_conversion import ImageConversionBackend
+            _renderers[name] = ImageConversionBackend(backend=name_to_build)
+    return _renderers[name]
+
+
+class PdfiumRenderer:
+    # Renders in-process, no Ghostscript process or library state per page
+    def convert(self, pdf_path, png_path, resolution=DEFAULT_DPI):
+        import cv2
+
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            bitmap = pdf[0].render(scale=resolution / 72)
+            cv2.imwrite(png_path, bitmap.to_numpy())
+        finally:
+            pdf.close()
+
+
+class CachedRasterBackend:
+    # Passed to camelot's Lattice as backend=. Page images are stored once
+    # per (document hash, page, dpi, renderer) and hard-linked into the path Lattice
+    # reads from, so repeated and parallel runs over the same PDF skip
+    # rendering entirely. Picklable, so it travels to pool workers.
+    def __init__(self, root, document_hash, dpi=DEFAULT_DPI, renderer="auto"):
+        self.root = root
+        self.document_hash = document_hash
+        self.dpi = dpi
+        self.renderer = renderer
+
+    def key(self, page_num):
+        payload = f"{self.document_hash}:{page_num}:{self.dpi}:{renderer_name(self.renderer)}"
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def convert(self, pdf_path, png_path, resolution=None):
+        match = PAGE_NAME.search(os.path.basename(pdf_path))
+        if match is None or (resolution is not None and resolution != self.dpi):
+            get_renderer(self.renderer).convert(pdf_path, png_path)
+            return
+
+        cached_path = os.path.join(self.root, f"{self.key(int(match.group(1)))}.png")
+        if os.path.exists(cached_path):
+            os.utime(cached_path)
+        else:
+            self.render(pdf_path, cached_path)
+        link_or_copy(cached_path, png_path)
+
+    def render(self, pdf_path, cached_path):
+        # Render next to the cache entry and rename into place, a concurrent
+        # worker rendering the same page just replaces it with equal bytes
+        fd, tmp_path = tempfile.mkstemp(prefix=".render-", suffix=".png", dir=self.root)
+        os.close(fd)
+        try:
+            get_renderer(self.renderer).convert(pdf_path, tmp_path)
+            os.replace(tmp_path, cached_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def link_or_copy(source, destination):
+    if os.path.exists(destination):
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        # Different filesystem or no hard link support
+        shutil.copyfile(source, destination)
+
+
+class RasterCache:
+    # On-disk store of rendered lattice page images. Workers only add
+    # entries, the server trims the directory back under max_bytes from
+    # its periodic sweep by dropping the least recently used images.
+    def __init__(self, root, max_bytes=2 * 1024 ** 3, renderer="auto"):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.renderer = renderer
+        os.makedirs(self.root, exist_ok=True)
+
+    def renderer_name(self):
+        return renderer_name(self.renderer)
+
+    def backend(self, document_hash, dpi=DEFAULT_DPI):
+        return CachedRasterBackend(self.root, document_hash, dpi, self.renderer)
+
+    def trim(self):
+        entries = []
+        size = 0
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith(".png") and not entry.name.startswith("."):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+                size += stat.st_size
+
+        removed = 0
+        for _, path, entry_size in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+        return removed
@@ -0,0 +1,131 @@
+import os
+import time
+import sqlite3
+import threading
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    filename TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    total_pages INTEGER,
+    created_at REAL NOT NULL,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS uploads_created_at ON uploads (created_at);
+
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    job_id TEXT,
+    source_filename TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    path TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_source ON artifacts (source_filename, session_id);
+CREATE INDEX IF NOT EXISTS artifacts_session ON artifacts (session_id);
+CREATE INDEX IF NOT EXISTS artifacts_job ON artifacts (job_id);
+CREATE INDEX IF NOT EXISTS artifacts_created_at ON artifacts (created_at);
+"""
+
+
+class Registry:
+    # SQLite index of uploaded PDFs and the files each extraction produced,
+    # so lookups and expiry don't have to list and stat the working directory
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(uploads)")]
+        if "content_hash" not in columns:
+            self._conn.execute("ALTER TABLE uploads ADD COLUMN content_hash TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS uploads_content_hash ON uploads (content_hash)")
+        self._conn.commit()
+
+    def add_upload(self, filename, path, total_pages, content_hash=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO uploads (filename, path, total_pages, created_at, content_hash) VALUES (?, ?, ?, ?, ?)",
+                (filename, path, total_pages, time.time(), content_hash)
+            )
+
+    def find_upload(self, content_hash):
+        # Newest upload with identical bytes whose file is still on disk
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT filename, path, total_pages FROM uploads WHERE content_hash = ? ORDER BY created_at DESC",
+                (content_hash,)
+            ).fetchall()
+        for filename, path, total_pages in rows:
+            if os.path.exists(path):
+                return {"filename": filename, "path": path, "total_pages": total_pages}
+        return None
+
+    def upload_pages(self, filename):
+        with self._lock:
+            row = self._conn.execute("SELECT total_pages FROM uploads WHERE filename = ?", (filename,)).fetchone()
+        return row[0] if row else None
+
+    def touch_upload(self, filename):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE uploads SET created_at = ? WHERE filename = ?", (time.time(), filename))
+
+    def add_artifacts(self, session_id, job_id, source_filename, files):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO artifacts (session_id, job_id, source_filename, filename, path, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(session_id, job_id, source_filename, os.path.basename(path), path, now) for path in files]
+            )
+
+    def latest_session_files(self, source_filename):
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT filename FROM artifacts
+                WHERE source_filename = ? AND session_id = (
+                    SELECT MAX(session_id) FROM artifacts WHERE source_filename = ?
+                )
+                ORDER BY id
+                """,
+                (source_filename, source_filename)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def job_files(self, job_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT filename FROM artifacts WHERE job_id = ? ORDER BY id", (job_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def expire(self, max_age):
+        # Deletes rows older than max_age seconds and the files behind them,
+        # returns the number of files removed
+        cutoff = time.time() - max_age
+        with self._lock, self._conn:
+            paths = [row[0] for row in self._conn.execute(
+                "SELECT path FROM artifacts WHERE created_at < ? UNION ALL SELECT path FROM uploads WHERE created_at < ?",
+                (cutoff, cutoff)
+            )]
+            self._conn.execute("DELETE FROM artifacts WHERE created_at < ?", (cutoff,))
+            self._conn.execute("DELETE FROM uploads WHERE created_at < ?", (cutoff,))
+
+        removed = 0
+        for path in paths:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,82 @@
+import pickle
+import tempfile
+
+
+def frames_nbytes(frames):
+    # deep=True counts the Python strings camelot puts in every cell, which
+    # are most of a table's footprint
+    return sum(int(df.memory_usage(index=True, deep=True).sum()) for df in frames)
+
+
+class MemoryBudget:
+    # Bytes of table data an extraction may hold in memory, shared by every
+    # PageStore of that extraction. limit=None never spills.
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+
+    def reserve(self, nbytes):
+        if self.limit is not None and self.used + nbytes > self.limit:
+            return False
+        self.used += nbytes
+        self.peak = max(self.peak, self.used)
+        return True
+
+    def release(self, nbytes):
+        self.used -= nbytes
+
+
+class PageStore:
+    # Page number -> frames, kept in memory while the budget allows and
+    # appended to an anonymous temp file once it is used up. The file is
+    # append-only, popped pages are not reclaimed until close() drops it.
+    def __init__(self, budget=None, spill_dir=None):
+        self.budget = budget or MemoryBudget()
+        self.spill_dir = spill_dir
+        self._memory = {}
+        self._spilled = {}
+        self._file = None
+        self.spilled_pages = 0
+        self.spilled_bytes = 0
+
+    def __contains__(self, page_num):
+        return page_num in self._memory or page_num in self._spilled
+
+    def put(self, page_num, frames):
+        nbytes = frames_nbytes(frames)
+        if self.budget.reserve(nbytes):
+            self._memory[page_num] = (frames, nbytes)
+            return
+
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(prefix="extract-spill-", dir=self.spill_dir)
+        self._file.seek(0, 2)
+        offset = self._file.tell()
+        pickle.dump(frames, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._spilled[page_num] = (offset, self._file.tell() - offset)
+        self.spilled_pages += 1
+        self.spilled_bytes += nbytes
+
+    def put_pages(self, page_results):
+        for page_num, frames in page_results:
+            self.put(page_num, frames)
+
+    def pop(self, page_num):
+        if page_num in self._memory:
+            frames, nbytes = self._memory.pop(page_num)
+            self.budget.release(nbytes)
+            return frames
+
+        offset, length = self._spilled.pop(page_num)
+        self._file.seek(offset)
+        return pickle.loads(self._file.read(length))
+
+    def close(self):
+        for _, nbytes in self._memory.values():
+            self.budget.release(nbytes)
+        self._memory = {}
+        self._spilled = {}
+        if self._file is not None:
+            self._file.close()
+            self._file = None
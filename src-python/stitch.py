@@ -0,0 +1,115 @@
+import re
+import pandas as pd
+
+# Column edges may drift this share of the table width between pages
+COLUMN_TOLERANCE = 0.05
+# Share of non-blank header cells that must match for a row to count as a
+# repeat of the first part's header
+HEADER_SIMILARITY = 0.8
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def header_cells(df):
+    if len(df) == 0:
+        return []
+    return [
+        WHITESPACE_PATTERN.sub(" ", value).strip().casefold() if isinstance(value, str) else ""
+        for value in df.iloc[0]
+    ]
+
+
+def header_similarity(first, df):
+    # Share of the first row's non-blank cells repeated in the same column
+    a, b = header_cells(first), header_cells(df)
+    if len(a) != len(b):
+        return 0
+    compared = [(x, y) for x, y in zip(a, b) if x or y]
+    if not compared:
+        return 0
+    return sum(x == y for x, y in compared) / len(compared)
+
+
+def column_edges(attrs):
+    # x0 and x1 of every column as camelot reported them, or of the whole
+    # table when the frame predates per-column positions
+    cols = attrs.get("cols")
+    if cols:
+        return [edge for col in cols for edge in col]
+    bbox = attrs.get("bbox")
+    if bbox:
+        return [bbox[0], bbox[2]]
+    return None
+
+
+def columns_aligned(previous, df):
+    a, b = column_edges(previous.attrs), column_edges(df.attrs)
+    if a is None or b is None or len(a) != len(b):
+        return None
+    width = max(max(a) - min(a), max(b) - min(b), 1)
+    return all(abs(x - y) <= COLUMN_TOLERANCE * width for x, y in zip(a, b))
+
+
+def continues(previous, df):
+    # A table carries on from the previous page's last table when it has
+    # the same columns at the same x-positions. Frames without positions
+    # fall back to a repeated header row.
+    if previous.shape[1] != df.shape[1]:
+        return False
+    aligned = columns_aligned(previous, df)
+    if aligned is None:
+        return header_similarity(previous, df) >= HEADER_SIMILARITY
+    return aligned
+
+
+class TableStitcher:
+    # Joins tables that run across page breaks, fed pages in page order.
+    # The last table of a page stays open until the next page shows
+    # whether its first table continues it. A page's tables are handed
+    # back once its last table is closed, as (page_num, frames) with every
+    # logical table concatenated exactly once.
+    def __init__(self):
+        self.page_num = None
+        self.last_page = None
+        self.closed = []
+        self.parts = []
+        self.pages = []
+
+    def feed(self, page_num, frames):
+        frames = list(frames)
+        if self.parts and frames and page_num == self.last_page + 1 and continues(self.parts[0], frames[0]):
+            part = frames.pop(0)
+            if header_similarity(self.parts[0], part) >= HEADER_SIMILARITY:
+                part = part.iloc[1:]
+            self.parts.append(part)
+            self.pages.append(page_num)
+            self.last_page = page_num
+            if not frames:
+                return []
+
+        finished = self.finish()
+        if frames:
+            self.page_num = page_num
+            self.last_page = page_num
+            self.closed = frames[:-1]
+            self.parts = [frames[-1]]
+            self.pages = [page_num]
+        return finished
+
+    def finish(self):
+        if not self.parts:
+            return []
+        frames = self.closed + [merge_parts(self.parts, self.pages)]
+        page_num = self.page_num
+        self.closed = []
+        self.parts = []
+        self.pages = []
+        return [(page_num, frames)]
+
+
+def merge_parts(parts, pages):
+    if len(parts) == 1:
+        return parts[0]
+    df = pd.concat(parts, ignore_index=True)
+    df.attrs = {**parts[0].attrs, "pages": pages}
+    return df
@@ -1,23 +1,250 @@
+import numpy as np
 import pandas as pd
-import camelot.io as camelot
 from datetime import datetime, timedelta
 import re
-import pypdf
-import traceback
-import asyncio
+import logging
+from engine import default_engine
+from document import PdfDocument, parse_pages
+from prescan import find_table_pages
+from spill import MemoryBudget, PageStore, frames_nbytes
+from stitch import TableStitcher
+from metrics import PAGES, TABLES, PAGES_SPILLED, POSTPROCESS_SECONDS, CONCAT_SECONDS, TYPING_SECONDS
+
+logger = logging.getLogger(__name__)
+
+ARABIC_PATTERN = re.compile(r'[\u0600-\u06FF]')
+DATE_PATTERN = re.compile(r'^\d{1,2}[-/]\d{1,2}[-/]\d{2,4}$')
+NUMBER_PATTERN = re.compile(r'^\d+(\.\d+)?$')
 
 def reverse_arabic_if_needed(x):
     if isinstance(x, str):
-        if re.search(r'[\u0600-\u06FF]', x):
+        if ARABIC_PATTERN.search(x):
             return x[::-1]  # Reverse the string
-        elif re.match(r'^\d{1,2}[-/]\d{1,2}[-/]\d{2,4}$', x) or re.match(r'^\d+(\.\d+)?$', x):
+        elif DATE_PATTERN.match(x) or NUMBER_PATTERN.match(x):
             return x  # Return unchanged for dates and numbers
     return x
 
+def arabic_mask(values):
+    # U+0600-U+06FF are exactly the code points whose UTF-8 lead byte is
+    # 0xD8-0xDB, so one scan over the column's encoded bytes finds every
+    # cell containing Arabic without a regex call per cell
+    if len(values) == 0:
+        return np.zeros(0, dtype=bool)
+
+    missing = None
+    try:
+        joined = "\x00".join(values)
+    except TypeError:
+        missing = pd.isna(values)
+        try:
+            joined = "\x00".join(np.where(missing, "", values))
+        except TypeError:
+            return None  # Mixed types, caller falls back to the regex
+
+    data = np.frombuffer(joined.encode("utf-8", "surrogatepass"), dtype=np.uint8)
+    separators = np.flatnonzero(data == 0)
+    if len(separators) != len(values) - 1:
+        return None  # Some cell contains NUL itself
+
+    lead_bytes = np.flatnonzero((data >= 0xD8) & (data <= 0xDB))
+    mask = np.zeros(len(values), dtype=bool)
+    mask[np.searchsorted(separators, lead_bytes)] = True
+    if missing is not None:
+        mask &= ~missing
+    return mask
+
+def reverse_arabic_columns(df):
+    # Column-wise equivalent of df.map(reverse_arabic_if_needed): only cells
+    # containing Arabic change, dates, numbers and non-strings pass through
+    df = df.copy()
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        if column.dtype != object:
+            continue
+
+        values = column.to_numpy()
+        mask = arabic_mask(values)
+        if mask is None:
+            mask = column.str.contains(ARABIC_PATTERN, na=False).to_numpy(dtype=bool)
+
+        if mask.any():
+            values = values.copy()
+            values[mask] = [x[::-1] for x in values[mask]]
+            df.isetitem(i, pd.Series(values, index=df.index, dtype=object))
+    return df
+
+def concat_tables(tables_list):
+    # Frames are normalized page by page as they are released, so the result
+    # needs no second pass over the whole document
+    with CONCAT_SECONDS.time():
+        return pd.concat([with_header(df) for df in tables_list], ignore_index=True)
+
+def normalize_frames(frames):
+    with POSTPROCESS_SECONDS.time():
+        return [reverse_arabic_columns(df) for df in frames]
+
+LEADING_ZERO_PATTERN = re.compile(r'^0\d')
+# Longer digit strings (account numbers, IDs) would lose digits as floats
+MAX_NUMBER_DIGITS = 15
+# Object columns with at most this share of distinct values become categorical
+CATEGORY_RATIO = 0.5
+CATEGORY_MIN_ROWS = 8
+
+def parse_dates(text, dayfirst=True):
+    # text only holds values matching DATE_PATTERN. Day and month order is
+    # taken from the column itself (a part above 12 settles it), dayfirst
+    # decides when every value is ambiguous. Two digit years follow strptime:
+    # 69-99 are 19xx, 00-68 are 20xx.
+    parts = text.str.split(r'[-/]', expand=True, regex=True)
+    first, second, year = parts[0].astype(int), parts[1].astype(int), parts[2].astype(int)
+    if (first > 12).any() and (second > 12).any():
+        return None
+    if (second > 12).any():
+        dayfirst = False
+    elif (first > 12).any():
+        dayfirst = True
+
+    year = year.where(parts[2].str.len() > 2, year + np.where(year < 69, 2000, 1900))
+    dates = pd.to_datetime(pd.DataFrame({
+        "year": year,
+        "month": second if dayfirst else first,
+        "day": first if dayfirst else second,
+    }), errors="coerce")
+    if dates.isna().any():
+        return None
+    return dates
+
+def infer_column_type(column, dayfirst=True):
+    # Typed copy of an all-string column, or None to keep it as text. Blank
+    # cells become missing values. Numbers with a leading zero are treated
+    # as codes and stay text.
+    if column.dtype != object or pd.api.types.infer_dtype(column, skipna=True) != "string":
+        return None
+
+    text = column.str.strip()
+    present = text.notna() & (text != "")
+    values = text[present]
+    if values.empty:
+        return None
+
+    if values.str.match(NUMBER_PATTERN).all():
+        if values.str.match(LEADING_ZERO_PATTERN).any() or values.str.len().max() > MAX_NUMBER_DIGITS:
+            return None
+        if values.str.contains('.', regex=False).any() or not present.all():
+            return pd.to_numeric(text.where(present), errors="coerce").astype("float64")
+        return pd.to_numeric(values, downcast="integer")
+
+    if values.str.match(DATE_PATTERN).all():
+        dates = parse_dates(values, dayfirst)
+        if dates is None:
+            return None
+        return dates.reindex(column.index)
+
+    if len(column) >= CATEGORY_MIN_ROWS and values.nunique() <= CATEGORY_RATIO * len(column):
+        return column.astype("category")
+    return None
+
+def header_row(df):
+    # True when the first row reads like column titles: text, and none of
+    # its cells is a number or a date
+    if len(df) < 2:
+        return False
+    titles = 0
+    for value in df.iloc[0]:
+        if not isinstance(value, str):
+            return False
+        value = value.strip()
+        if NUMBER_PATTERN.match(value) or DATE_PATTERN.match(value):
+            return False
+        titles += bool(value)
+    return titles > 0
+
+def typed_columns(df, dayfirst):
+    typed = {}
+    for i in range(df.shape[1]):
+        column = infer_column_type(df.iloc[:, i], dayfirst)
+        if column is not None:
+            typed[i] = column
+    return typed
+
+def infer_types(df, dayfirst=True):
+    # Casts number and date columns to int, float and datetime and columns
+    # of repeated labels to categorical. A first row of titles is taken out
+    # of the body so it does not force its columns back to object dtype, it
+    # is kept in attrs["header"] and the writers put it back above the rows.
+    start = 1 if header_row(df) else 0
+    body = df.iloc[start:]
+    typed = typed_columns(body, dayfirst)
+    if not typed:
+        return df
+
+    result = body.copy()
+    for i, column in typed.items():
+        result.isetitem(i, column)
+    result.attrs = dict(df.attrs)
+    if start:
+        result.attrs["header"] = list(df.iloc[0])
+    return result
+
+def with_header(df):
+    # Plain frame with a typed table's title row back in row 0, for
+    # consumers that do not read attrs["header"]
+    header = df.attrs.get("header")
+    if header is None:
+        return df
+    return pd.concat([pd.DataFrame([header], columns=df.columns), df.astype(object)], ignore_index=True)
+
+def table_preview(df, max_rows):
+    # JSON-ready head of a table for clients rendering results as they arrive
+    head = reverse_arabic_columns(df.head(max_rows))
+    return {
+        "shape": list(df.shape),
+        "columns": [str(c) for c in head.columns],
+        "rows": head.astype(object).where(head.notna(), None).values.tolist(),
+        "truncated": len(df) > max_rows,
+        "metadata": {k: v for k, v in df.attrs.items() if k != "page"},
+    }
+
 class ExtractTable:
-    def __init__(self, file_path, progress_queue=None):
+    def __init__(self, file_path, progress_queue=None, engine=None, cache=None, sink=None, prescan=False,
+                 checkpoint=None, results=None, preview_rows=100, memory_limit=None, spill_dir=None,
+                 typed=False, stitch=False):
         self.file_path = file_path
         self.progress_queue = progress_queue
+        self.engine = engine or default_engine()
+        self.cache = cache
+        # Optional page consumer (e.g. StreamingExcelWriter), when set pages are
+        # written out in order as they finish instead of being kept in memory
+        self.sink = sink
+        # Skip pages whose content stream shows no sign of a table
+        self.prescan = prescan
+        self.skipped_pages = []
+        # Optional JobCheckpoint, finished pages are saved there and restored
+        # from it when the same job runs again
+        self.checkpoint = checkpoint
+        self.resumed_pages = 0
+        # Optional channel that gets one "table" event per table as soon as
+        # its page is parsed, in completion order rather than page order
+        self.results = results
+        self.preview_rows = preview_rows
+        self.tables_published = 0
+        # Bytes of table data held while pages wait for an earlier page or for
+        # the final concat, pages past it go to a spill file in spill_dir
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.pending = None
+        self.collected = None
+        self.spilled_pages = 0
+        self.peak_memory = 0
+        # Cast number, date and repeated-label columns after normalization,
+        # memory_before/memory_after are the table bytes on either side
+        self.typed = typed
+        self.memory_before = 0
+        self.memory_after = 0
+        # Join tables that continue across page breaks into one table
+        self.stitch = stitch
+        self.stitcher = None
+        self.tables_found = 0
         self.current_page = 0
         self.total_pages_to_process = 0
         self.last_progress_time = None
@@ -49,66 +276,233 @@ class ExtractTable:
                     if msg_type == "completion":
                         progress_data["extractionComplete"] = True
                         progress_data["tables"] = processed_pages
+                        if self.skipped_pages:
+                            progress_data["skippedPages"] = self.skipped_pages
 
-                    print(f"Reporting progress: {progress_data}")
+                    logger.debug("Reporting progress: %s", progress_data)
                     await self.progress_queue.put(progress_data)
                     self.last_progress_time = current_time
 
-            except Exception as e:
-                print(f"Error reporting progress: {str(e)}")
-                print(traceback.format_exc())
-
-    async def extract_table_by_range(self, start_page, end_page, flavor):
+            except Exception:
+                logger.exception("Error reporting progress")
+
+    async def extract_pages(self, document, page_numbers, flavor, total_pages):
+        # Fan pages out to the engine and release them in page order: to the
+        # sink when there is one, otherwise into self.collected for the
+        # final concat. Both page stores share one memory budget.
+        page_numbers = list(page_numbers)
+        budget = MemoryBudget(self.memory_limit)
+        self.pending = PageStore(budget, self.spill_dir)
+        self.collected = PageStore(budget, self.spill_dir) if self.sink is None else None
+        self.stitcher = TableStitcher() if self.stitch else None
         try:
-            total_pages = end_page - start_page + 1
-            await self.report_progress(
-                f"Starting extraction for pages {start_page} to {end_page}",
-                0, 0, total_pages
+            return await self.extract_pages_in_order(document, page_numbers, flavor, total_pages)
+        finally:
+            self.spilled_pages = self.pending.spilled_pages
+            spilled_bytes = self.pending.spilled_bytes
+            self.pending.close()
+            if self.collected is not None:
+                self.spilled_pages += self.collected.spilled_pages
+                spilled_bytes += self.collected.spilled_bytes
+                self.collected.close()
+            self.peak_memory = budget.peak
+            if self.spilled_pages:
+                PAGES_SPILLED.inc(self.spilled_pages)
+                logger.info(
+                    "Spilled %d pages (%d bytes) of %s to disk, memory limit %d bytes",
+                    self.spilled_pages, spilled_bytes, self.file_path, self.memory_limit
+                )
+            if self.typed and self.memory_before:
+                logger.info(
+                    "Typed columns of %s: %d bytes of tables before, %d after",
+                    self.file_path, self.memory_before, self.memory_after
+                )
+
+    async def extract_pages_in_order(self, document, page_numbers, flavor, total_pages):
+        page_results = {}
+
+        # Pages already extracted from identical bytes skip camelot entirely
+        if self.cache is not None:
+            document_hash = await self.engine.run_in_thread(document.content_hash)
+            cache_params = self.engine.cache_params(flavor)
+            page_results = await self.engine.run_in_thread(
+                self.cache.get_pages, document_hash, page_numbers, flavor, cache_params
             )
+            PAGES.inc(len(page_results), source="cache")
 
-            tables_list = []
-            for idx, page_num in enumerate(range(start_page, end_page + 1), 1):
-                # Process the current page
-                page_tables = camelot.read_pdf(
-                    self.file_path,
-                    pages=str(page_num),
-                    flavor=flavor
+        if self.checkpoint is not None:
+            restored = await self.engine.run_in_thread(
+                self.checkpoint.get_pages,
+                [page_num for page_num in page_numbers if page_num not in page_results]
+            )
+            page_results.update(restored)
+            self.resumed_pages += len(restored)
+            PAGES.inc(len(restored), source="checkpoint")
+            if restored:
+                await self.report_progress(
+                    f"Resumed {len(restored)} pages from checkpoint",
+                    (len(page_results) / total_pages) * 100,
+                    len(page_results),
+                    total_pages
                 )
 
-                if len(page_tables) > 0:
-                    tables_list.extend([table.df for table in page_tables])
+        missing_pages = [page_num for page_num in page_numbers if page_num not in page_results]
+        self.skipped_pages = []
+        if self.prescan and missing_pages:
+            candidates = set(await self.engine.run_in_thread(
+                find_table_pages, document, missing_pages, flavor
+            ))
+            self.skipped_pages = [page_num for page_num in missing_pages if page_num not in candidates]
+            for page_num in self.skipped_pages:
+                page_results[page_num] = []
+            PAGES.inc(len(self.skipped_pages), source="skipped")
+            missing_pages = [page_num for page_num in missing_pages if page_num in candidates]
+
+        processed = len(page_results)
+        self.tables_found = 0
+        for page_num in page_numbers:
+            if page_num in page_results:
+                self.publish_tables(page_num, page_results[page_num])
+        released = await self.engine.run_in_thread(
+            self.release_pages, page_numbers, page_results.items(), 0
+        )
+        page_results = None
+
+        async for chunk in self.engine.map_pages(document, missing_pages, flavor):
+            if self.cache is not None:
+                await self.engine.run_in_thread(self.cache.put_pages, document_hash, chunk, flavor, cache_params)
+            if self.checkpoint is not None:
+                await self.engine.run_in_thread(self.checkpoint.put_pages, chunk)
+
+            PAGES.inc(len(chunk), source="parsed")
+            for page_num, frames in chunk:
+                processed += 1
+                TABLES.inc(len(frames))
+                self.publish_tables(page_num, frames)
 
-                # Report progress
-                percentage = (idx / total_pages) * 100
                 await self.report_progress(
                     f"Processing page {page_num}",
-                    percentage, idx, total_pages
+                    (processed / total_pages) * 100,
+                    processed,
+                    total_pages
                 )
 
-                # Add a small delay to prevent overwhelming the system
-                await asyncio.sleep(0.1)
+            released = await self.engine.run_in_thread(self.release_pages, page_numbers, chunk, released)
+
+        if self.stitcher is not None:
+            await self.engine.run_in_thread(self.emit_groups, self.stitcher.finish())
+        if self.collected is None:
+            return []
+        return await self.engine.run_in_thread(self.collected_frames, page_numbers)
+
+    def release_pages(self, page_numbers, page_results, released):
+        # Runs in the I/O thread. Normalizes the finished prefix of the page
+        # list and hands it on in page order, pages that arrived ahead of an
+        # unfinished one wait in self.pending.
+        incoming = dict(page_results)
+        while released < len(page_numbers):
+            page_num = page_numbers[released]
+            if page_num in incoming:
+                frames = incoming.pop(page_num)
+            elif page_num in self.pending:
+                frames = self.pending.pop(page_num)
+            else:
+                break
+            if frames:
+                frames = normalize_frames(frames)
+            if self.stitcher is not None:
+                self.emit_groups(self.stitcher.feed(page_num, frames))
+            elif frames:
+                self.emit(page_num, frames)
+            released += 1
+
+        self.pending.put_pages(incoming.items())
+        return released
+
+    def emit_groups(self, groups):
+        for page_num, frames in groups:
+            self.emit(page_num, frames)
+
+    def emit(self, page_num, frames):
+        # Final tables of a page: typed when asked, then written or kept
+        if self.typed:
+            self.memory_before += frames_nbytes(frames)
+            with TYPING_SECONDS.time():
+                frames = [infer_types(df) for df in frames]
+            self.memory_after += frames_nbytes(frames)
+        if self.sink is not None:
+            self.sink.write_page(page_num, frames)
+        else:
+            self.collected.put(page_num, frames)
+        self.tables_found += len(frames)
+
+    def memory_report(self):
+        if not self.typed:
+            return None
+        return {"before_bytes": self.memory_before, "after_bytes": self.memory_after}
+
+    def collected_frames(self, page_numbers):
+        tables_list = []
+        for page_num in page_numbers:
+            if page_num in self.collected:
+                tables_list.extend(self.collected.pop(page_num))
+        return tables_list
+
+    def publish_tables(self, page_num, frames):
+        if self.results is None:
+            return
+        for index, df in enumerate(frames):
+            self.tables_published += 1
+            self.results.publish({
+                "type": "table",
+                "page": page_num,
+                "index": index,
+                "table": self.tables_published,
+                **table_preview(df, self.preview_rows)
+            })
+
+    def skipped_note(self):
+        if not self.skipped_pages:
+            return ""
+        return f" (pre-scan skipped {len(self.skipped_pages)} pages without tables)"
+
+    async def merge(self, tables_list):
+        # With a sink every page has already been written out
+        if self.sink is not None:
+            return self.sink
+        return await self.engine.run_in_thread(concat_tables, tables_list)
+
+    async def extract_table_by_range(self, start_page, end_page, flavor):
+        try:
+            total_pages = end_page - start_page + 1
+            await self.report_progress(
+                f"Starting extraction for pages {start_page} to {end_page}",
+                0, 0, total_pages
+            )
+
+            with await self.engine.run_in_thread(PdfDocument, self.file_path) as document:
+                tables_list = await self.extract_pages(
+                    document, range(start_page, end_page + 1), flavor, total_pages
+                )
 
-            if not tables_list:
+            if not self.tables_found:
                 await self.report_progress(
-                    "No tables found in specified range",
+                    "No tables found in specified range" + self.skipped_note(),
                     100, total_pages, total_pages,
                     msg_type="completion"
                 )
                 return pd.DataFrame()
 
             await self.report_progress(
-                f"Found {len(tables_list)} tables in specified range",
-                100, len(tables_list), len(tables_list),
+                f"Found {self.tables_found} tables in specified range" + self.skipped_note(),
+                100, self.tables_found, self.tables_found,
                 msg_type="completion"
             )
 
-            df = pd.concat(tables_list, ignore_index=True)
-            df = df.map(reverse_arabic_if_needed)
-            return df
+            return await self.merge(tables_list)
 
         except Exception as e:
-            print(f"Error extracting tables from range {start_page}-{end_page}: {str(e)}")
-            print(traceback.format_exc())
+            logger.exception("Error extracting tables from range %s-%s", start_page, end_page)
             await self.report_progress(
                 f"Error: {str(e)}",
                 0, 0, total_pages,
@@ -123,29 +517,27 @@ class ExtractTable:
                 0, 0, 1
             )
 
-            tables = camelot.read_pdf(self.file_path, pages=str(page), flavor=flavor)
+            with await self.engine.run_in_thread(PdfDocument, self.file_path) as document:
+                tables = await self.extract_pages(document, [page], flavor, 1)
 
-            if len(tables) == 0:
+            if not self.tables_found:
                 await self.report_progress(
-                    f"No tables found on page {page}",
+                    f"No tables found on page {page}" + self.skipped_note(),
                     100, 1, 1,
                     msg_type="completion"
                 )
                 return pd.DataFrame()
 
             await self.report_progress(
-                f"Found {len(tables)} tables in page {page}",
-                100, len(tables), len(tables),
+                f"Found {self.tables_found} tables in page {page}" + self.skipped_note(),
+                100, self.tables_found, self.tables_found,
                 msg_type="completion"
             )
 
-            df = pd.concat([table.df for table in tables], ignore_index=True)
-            df = df.map(reverse_arabic_if_needed)
-            return df
+            return await self.merge(tables)
 
         except Exception as e:
-            print(f"Error extracting table from page {page}: {str(e)}")
-            print(traceback.format_exc())
+            logger.exception("Error extracting table from page %s", page)
             await self.report_progress(
                 f"Error: {str(e)}",
                 0, 0, 1,
@@ -154,70 +546,42 @@ class ExtractTable:
             raise
 
     async def extract_table_from_pdf(self, flavor='lattice', pages='all'):
+        total_pages = 0
         try:
-            with open(self.file_path, 'rb') as f:
-                pdf_reader = pypdf.PdfReader(f)
-                total_pages = len(pdf_reader.pages)
-
-            await self.report_progress(
-                "Starting full PDF extraction",
-                0, 0, total_pages
-            )
-
-            current_page = 0
-            tables_list = []
-
-            if pages == 'all':
-                page_range = range(1, total_pages + 1)
-            else:
-                page_range = [int(p) for p in pages.split(',')]
-
-            for page_num in page_range:
-                current_page += 1
-
-                page_tables = camelot.read_pdf(
-                    self.file_path,
-                    pages=str(page_num),
-                    flavor=flavor
-                )
-
-                if len(page_tables) > 0:
-                    tables_list.extend([table.df for table in page_tables])
+            with await self.engine.run_in_thread(PdfDocument, self.file_path) as document:
+                total_pages = document.total_pages
+                # Any page selection ("all", "1-5,9,12-", "last") is one
+                # sorted batch through the engine
+                page_range = parse_pages(pages, total_pages)
 
                 await self.report_progress(
-                    f"Processing page {page_num}",
-                    (current_page / total_pages) * 100,
-                    current_page,
-                    total_pages
+                    "Starting full PDF extraction" if pages == 'all'
+                    else f"Starting extraction of {len(page_range)} pages",
+                    0, 0, len(page_range)
                 )
 
-                await asyncio.sleep(0.1)
+                tables_list = await self.extract_pages(
+                    document, page_range, flavor, len(page_range)
+                )
 
-            if not tables_list:
+            if not self.tables_found:
                 await self.report_progress(
-                    "No tables found in document",
+                    "No tables found in document" + self.skipped_note(),
                     100, total_pages, total_pages,
                     msg_type="completion"
                 )
                 return pd.DataFrame()
 
             await self.report_progress(
-                f"Found {len(tables_list)} tables in document",
-                100, len(tables_list), len(tables_list),
+                f"Found {self.tables_found} tables in document" + self.skipped_note(),
+                100, self.tables_found, self.tables_found,
                 msg_type="completion"
             )
 
-            df = pd.concat(tables_list, ignore_index=True)
-            df = df.map(reverse_arabic_if_needed)
-            return df
+            return await self.merge(tables_list)
 
         except Exception as e:
-            with open(self.file_path, 'rb') as f:
-                pdf_reader = pypdf.PdfReader(f)
-                total_pages = len(pdf_reader.pages)
-
-            print(f"Error extracting tables from PDF: {str(e)}")
-            print(traceback.format_exc())
+            logger.exception("Error extracting tables from PDF")
             await self.report_progress(
                 f"Error: {str(e)}",
                 0, 0, total_pages,
@@ -259,6 +259,15 @@ export default function AdvancedExtraction({
                 </span>
               </Label>
             </div>
+            <div className="flex items-center space-x-2 md:space-x-4">
+              <RadioGroupItem value="auto" id="auto" />
+              <Label htmlFor="auto" className="text-sm md:text-base">
+                Auto{" "}
+                <span className="text-sm font-extralight text-gray-500">
+                  (picks lattice or stream for each page)
+                </span>
+              </Label>
+            </div>
           </RadioGroup>
         </div>
 
@@ -48,6 +48,7 @@ export default function Extract({
   const [isExtracting, setIsExtracting] = useState<boolean>(false);
   const { toast } = useToast();
   const [showProgress, setShowProgress] = useState<boolean>(false);
+  const [jobId, setJobId] = useState<string | null>(null);
 
   // Fetch excel files after extraction
   const fetchExcelFiles = async (filename: string): Promise<void> => {
@@ -82,16 +83,20 @@ export default function Extract({
   // Handle the extraction process
   const handleExtraction = async (): Promise<void> => {
     console.log("Uploading PDF file:", fileName);
+    // Chosen here so the progress panel can subscribe to this job before
+    // the blocking request below returns
+    const extractionJobId = crypto.randomUUID().replace(/-/g, "");
+    setJobId(extractionJobId);
     setIsExtracting(true);
     setShowProgress(true);
     setFiles([]);
 
     try {
-      let query: string = `http://localhost:8008/extract-tables?filename=${fileName}`;
+      let query: string = `http://localhost:8008/extract-tables?filename=${fileName}&job_id=${extractionJobId}`;
 
       // Add query parameters based on settings
-      if (settings.extractionMethod === "stream") {
-        query += `&flavor=stream`;
+      if (settings.extractionMethod === "stream" || settings.extractionMethod === "auto") {
+        query += `&flavor=${settings.extractionMethod}`;
       }
 
       // Handle different page selection types
@@ -203,6 +208,7 @@ export default function Extract({
       {showProgress && (
         <ExtractionProgress
           isExtracting={isExtracting}
+          jobId={jobId}
           selectedPages={
             settings.pageSelection === "all" ? "all" : settings.selectedPages
           }
@@ -18,6 +18,7 @@ interface ProgressMessage {
 
 interface ExtractionProgressProps {
   isExtracting: boolean;
+  jobId?: string | null;
   selectedPages?: string | number | number[];
   extractionMethod?: string;
   onExtractionComplete?: (tableCount: number) => void;
@@ -25,6 +26,7 @@ interface ExtractionProgressProps {
 
 export function ExtractionProgress({
   isExtracting,
+  jobId,
   onExtractionComplete,
 }: ExtractionProgressProps) {
   // State management
@@ -92,8 +94,11 @@ export function ExtractionProgress({
       setError(null);
 
       // Create new EventSource connection
+      // Without a job ID the server attaches to the newest job
       eventSource = new EventSource(
-        "http://localhost:8008/extraction-progress",
+        jobId
+          ? `http://localhost:8008/extraction-progress?job_id=${jobId}`
+          : "http://localhost:8008/extraction-progress",
       );
 
       eventSource.onmessage = (event) => {
@@ -122,7 +127,7 @@ export function ExtractionProgress({
         eventSource.close();
       }
     };
-  }, [isExtracting, handleServerMessage]);
+  }, [isExtracting, jobId, handleServerMessage]);
 
   // Helper functions for UI elements
   const getStatusIcon = () => {
@@ -0,0 +1,48 @@
+import os
+import sys
+import pandas as pd
+from openpyxl import load_workbook
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src-python"))
+
+from export import StreamingExcelWriter, StreamingCsvWriter
+
+
+def sheet_rows(path):
+    return [list(row) for row in load_workbook(path).active.iter_rows(values_only=True)]
+
+
+def test_wider_table_gets_a_header_naming_every_column(tmp_path):
+    path = str(tmp_path / "out.xlsx")
+    writer = StreamingExcelWriter(path)
+    writer.write_page(1, [pd.DataFrame([["a", "b"]])])
+    writer.write_page(2, [pd.DataFrame([["c", "d", "e"], ["f", "g", "h"]])])
+    writer.close()
+
+    assert sheet_rows(path) == [
+        [0, 1, None],
+        ["a", "b", None],
+        [0, 1, 2],
+        ["c", "d", "e"],
+        ["f", "g", "h"],
+    ]
+
+
+def test_narrower_table_keeps_the_current_header(tmp_path):
+    path = str(tmp_path / "out.xlsx")
+    writer = StreamingExcelWriter(path)
+    writer.write_page(1, [pd.DataFrame([["a", "b", "c"]]), pd.DataFrame([["d", "e"]])])
+    writer.close()
+
+    assert sheet_rows(path) == [[0, 1, 2], ["a", "b", "c"], ["d", "e", None]]
+
+
+def test_csv_wider_table_gets_a_header_naming_every_column(tmp_path):
+    path = str(tmp_path / "out.csv")
+    writer = StreamingCsvWriter(path)
+    writer.write_page(1, [pd.DataFrame([["a", "b"]])])
+    writer.write_page(2, [pd.DataFrame([["c", "d", "e"]])])
+    writer.close()
+
+    with open(path, encoding="utf-8-sig") as f:
+        assert f.read().splitlines() == ["page,table,0,1", "1,1,a,b", "page,table,0,1,2", "2,2,c,d,e"]
@@ -0,0 +1,59 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src-python"))
+
+from util import infer_types, concat_tables
+from export import StreamingCsvWriter
+
+
+def titled_table(rows=1000):
+    # Camelot's shape: integer labels, every cell text, titles in row 0
+    return pd.DataFrame(
+        [["Date", "Count", "Amount", "Code"]]
+        + [[f"{i % 28 + 1:02d}/03/2024", str(i), f"{i}.50", f"0{i}"] for i in range(rows)]
+    )
+
+
+def test_title_row_moves_to_attrs_and_columns_are_typed():
+    df = titled_table()
+    df.attrs["page"] = 3
+    typed = infer_types(df)
+
+    assert typed.attrs["header"] == ["Date", "Count", "Amount", "Code"]
+    assert typed.attrs["page"] == 3
+    assert len(typed) == len(df) - 1
+    assert list(typed.columns) == list(df.columns)
+    assert pd.api.types.is_datetime64_any_dtype(typed[0])
+    assert pd.api.types.is_integer_dtype(typed[1])
+    assert typed[2].dtype == "float64"
+    # Leading zeros mark codes, they stay text
+    assert typed[3].dtype == object
+    assert typed.memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum() / 2
+
+
+def test_table_without_titles_keeps_every_row():
+    df = pd.DataFrame([["1", "2024-x"], ["2", "2024-y"], ["3", "2024-z"]])
+    typed = infer_types(df)
+
+    assert "header" not in typed.attrs
+    assert len(typed) == 3
+    assert pd.api.types.is_integer_dtype(typed[0])
+
+
+def test_title_row_is_written_back():
+    typed = infer_types(titled_table(3))
+    assert concat_tables([typed]).iloc[0].tolist() == ["Date", "Count", "Amount", "Code"]
+
+
+def test_csv_writes_title_row_above_typed_rows(tmp_path):
+    path = str(tmp_path / "out.csv")
+    writer = StreamingCsvWriter(path)
+    writer.write_page(1, [infer_types(titled_table(2))])
+    writer.close()
+
+    with open(path, encoding="utf-8-sig") as f:
+        lines = f.read().splitlines()
+    assert lines[1] == "1,1,Date,Count,Amount,Code"
+    assert lines[2] == "1,1,2024-03-01 00:00:00,0,0.5,00"